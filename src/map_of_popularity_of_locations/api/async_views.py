@@ -0,0 +1,178 @@
+"""Async (ASGI-native) versions of the hot read endpoints.
+
+They answer from the same rendered-JSON cache entries as the DRF views and, on
+a miss, build the query, page and body with those views' own queryset, filters,
+pagination and serializer, so both paths return identical bodies. Redis is
+reached through ``redis.asyncio`` (``InstrumentedRedisCache.aget``/``aset``)
+and the database through the async ORM, so under ASGI a request only leaves the
+event loop for the SQL itself.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from locations.routers import (
+    ais_user_pinned_to_primary,
+    allow_replica_reads,
+    areplicas_may_lag,
+    replica_reads_enabled,
+    reset_replica_reads,
+)
+from registration.auth import SignedTokenAuthentication
+
+from .helpers import (
+    aget_location_list_cache_key,
+    aget_reviews_cache_key,
+    get_likes_dislikes_cache_key,
+    get_location_detail_cache_key,
+    get_query_params_digest,
+)
+from .models import Location, Review
+from .views import LocationViewSet, ReviewViewSet
+
+
+def json_response(data, status=200):
+    # Rendered like the DRF views' responses, byte for byte.
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+class AsyncReadView(View):
+    """Authentication, replica routing and response caching of the DRF read views."""
+
+    http_method_names = ["get", "head", "options"]
+    response_cache_timeout = 300
+    reads_from_replica = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+            if not request.user.is_authenticated:
+                raise NotAuthenticated()
+            self.reads_from_replica = replica_reads_enabled() and not (
+                await ais_user_pinned_to_primary(request.user.pk)
+            )
+            token = allow_replica_reads(self.reads_from_replica)
+            try:
+                return await super().dispatch(request, *args, **kwargs)
+            finally:
+                reset_replica_reads(token)
+        except Http404 as exc:
+            return json_response({"detail": str(exc) or "Not found."}, status=404)
+        except APIException as exc:
+            status = exc.status_code
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                # As in the DRF views, whose first authenticator (session) sends no
+                # WWW-Authenticate header.
+                status = 403
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return json_response(detail, status=status)
+
+    async def authenticate(self, request):
+        result = await SignedTokenAuthentication().aauthenticate(request)
+        if result is not None:
+            return result[0]
+        return await sync_to_async(get_user)(request)
+
+    async def may_be_stale(self):
+        return self.reads_from_replica and await areplicas_may_lag()
+
+    def get_params_digest(self):
+        # Page links point at the async URLs, so pages are cached apart from
+        # the DRF view's; detail bodies are shared.
+        return "async-" + get_query_params_digest(self.request.GET)
+
+    def get_drf_view(self, view_class, action, **kwargs):
+        """The DRF view to borrow queryset, filters, pagination and serializer from."""
+        drf_request = Request(self.request)
+        drf_request.user = self.request.user
+        return view_class(
+            request=drf_request, action=action, format_kwarg=None, args=(), kwargs=kwargs
+        )
+
+    @staticmethod
+    def cached_response(body):
+        response = HttpResponse(body, content_type="application/json")
+        response["X-Cache"] = "HIT"
+        return response
+
+    async def render_and_cache(self, data, cache_key):
+        response = json_response(data)
+        if not await self.may_be_stale():
+            await cache.aset(cache_key, response.content, timeout=self.response_cache_timeout)
+            response["X-Cache"] = "MISS"
+        return response
+
+    async def get_paginated_data(self, view):
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await view.paginator.apaginate_queryset(queryset, view.request, view)
+        serializer = view.get_serializer(page, many=True)
+        return view.paginator.get_paginated_response(serializer.data).data
+
+
+class AsyncLocationListView(AsyncReadView):
+    response_cache_timeout = LocationViewSet.response_cache_timeout
+
+    async def get(self, request):
+        cache_key = await aget_location_list_cache_key(self.get_params_digest())
+        body = await cache.aget(cache_key)
+        if body is not None:
+            return self.cached_response(body)
+
+        data = await self.get_paginated_data(self.get_drf_view(LocationViewSet, "list"))
+        return await self.render_and_cache(data, cache_key)
+
+
+class AsyncLocationDetailView(AsyncReadView):
+    response_cache_timeout = LocationViewSet.response_cache_timeout
+
+    async def get(self, request, pk):
+        cache_key = get_location_detail_cache_key(pk)
+        body = await cache.aget(cache_key)
+        if body is not None:
+            return self.cached_response(body)
+
+        view = self.get_drf_view(LocationViewSet, "retrieve", pk=pk)
+        try:
+            location = await view.filter_queryset(view.get_queryset()).aget(pk=pk)
+        except Location.DoesNotExist:
+            raise Http404("No Location matches the given query.")
+        return await self.render_and_cache(view.get_serializer(location).data, cache_key)
+
+
+class AsyncReviewListView(AsyncReadView):
+    response_cache_timeout = ReviewViewSet.response_cache_timeout
+
+    async def get(self, request, location_pk):
+        cache_key = await aget_reviews_cache_key(location_pk, self.get_params_digest())
+        body = await cache.aget(cache_key)
+        if body is not None:
+            return self.cached_response(body)
+
+        view = self.get_drf_view(ReviewViewSet, "list", location_pk=location_pk)
+        return await self.render_and_cache(await self.get_paginated_data(view), cache_key)
+
+
+class AsyncLikeDislikeView(AsyncReadView):
+    async def get(self, request, review_pk):
+        cache_key = get_likes_dislikes_cache_key(review_pk)
+        cached_data = await cache.aget(cache_key)
+        if cached_data:
+            return json_response(cached_data)
+
+        response_data = (
+            await Review.objects.filter(pk=review_pk)
+            .values("likes_count", "dislikes_count")
+            .afirst()
+        )
+        if response_data is None:
+            return json_response({"detail": "Review not found."}, status=404)
+
+        if not await self.may_be_stale():
+            await cache.aset(cache_key, response_data, timeout=300)
+        return json_response(response_data)
@@ -0,0 +1,155 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast, Floor
+
+from .geo import filter_bbox
+from .helpers import get_cluster_cell_cache_key
+
+MAX_CLUSTER_ZOOM = 18
+MAX_CLUSTER_CELLS = 4096
+CLUSTER_CELL_TIMEOUT = 60 * 60 * 24
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+
+def cell_size(zoom):
+    """Edge of a grid cell in degrees; zoom 0 is one cell, each level splits it in four."""
+    return 360.0 / (2**zoom)
+
+
+def grid_shape(zoom):
+    size = cell_size(zoom)
+    return 2**zoom, max(1, math.ceil(180.0 / size))
+
+
+def cell_for(zoom, lat, lng):
+    size = cell_size(zoom)
+    columns, rows = grid_shape(zoom)
+    x = min(int((lng + 180.0) // size), columns - 1)
+    y = min(int((lat + 90.0) // size), rows - 1)
+    return x, y
+
+
+def cell_bounds(zoom, x, y):
+    size = cell_size(zoom)
+    min_lng = x * size - 180.0
+    min_lat = y * size - 90.0
+    return min_lng, min_lat, min(min_lng + size, 180.0), min(min_lat + size, 90.0)
+
+
+def _cell_range(zoom, bbox):
+    min_lng, min_lat, max_lng, max_lat = bbox
+    min_x, min_y = cell_for(zoom, min_lat, min_lng)
+    max_x, max_y = cell_for(zoom, max_lat, max_lng)
+    return range(min_x, max_x + 1), range(min_y, max_y + 1)
+
+
+def count_cells_in_bbox(zoom, bbox):
+    xs, ys = _cell_range(zoom, bbox)
+    return len(xs) * len(ys)
+
+
+def cells_in_bbox(zoom, bbox):
+    xs, ys = _cell_range(zoom, bbox)
+    return [(x, y) for x in xs for y in ys]
+
+
+def cluster_cache_keys_for_point(lat, lng):
+    """Cache keys of every cell, at every zoom level, that contains a point."""
+    if lat is None or lng is None:
+        return []
+    return [
+        get_cluster_cell_cache_key(zoom, *cell_for(zoom, lat, lng))
+        for zoom in range(MAX_CLUSTER_ZOOM + 1)
+    ]
+
+
+def _empty_cell():
+    return {"count": 0, "rating_sum": 0.0, "lat_sum": 0.0, "lng_sum": 0.0, "categories": {}}
+
+
+def aggregate_cells(queryset, zoom, cells):
+    """Aggregate the given cells with one GROUP BY (cell x, cell y, category) query."""
+    if not cells:
+        return {}
+    xs = [x for x, _ in cells]
+    ys = [y for _, y in cells]
+    min_lng, min_lat, _, _ = cell_bounds(zoom, min(xs), min(ys))
+    _, _, max_lng, max_lat = cell_bounds(zoom, max(xs), max(ys))
+
+    size = cell_size(zoom)
+    rows = (
+        filter_bbox(queryset, min_lng, min_lat, max_lng, max_lat)
+        .order_by()
+        .annotate(
+            cell_x=Cast(Floor((F("longitude") + 180.0) / size), IntegerField()),
+            cell_y=Cast(Floor((F("latitude") + 90.0) / size), IntegerField()),
+        )
+        .values("cell_x", "cell_y", "category")
+        .annotate(
+            count=Count("id"),
+            rating_sum=Sum("average_rating"),
+            lat_sum=Sum("latitude"),
+            lng_sum=Sum("longitude"),
+        )
+    )
+
+    columns, grid_rows = grid_shape(zoom)
+    wanted = set(cells)
+    aggregates = {cell: _empty_cell() for cell in cells}
+    for row in rows:
+        cell = (min(row["cell_x"], columns - 1), min(row["cell_y"], grid_rows - 1))
+        if cell not in wanted:
+            continue
+        aggregate = aggregates[cell]
+        aggregate["count"] += row["count"]
+        aggregate["rating_sum"] += row["rating_sum"] or 0.0
+        aggregate["lat_sum"] += row["lat_sum"]
+        aggregate["lng_sum"] += row["lng_sum"]
+        categories = aggregate["categories"]
+        categories[row["category"]] = categories.get(row["category"], 0) + row["count"]
+    return aggregates
+
+
+def get_cluster_aggregates(queryset, zoom, bbox, use_cache=True):
+    """Per-cell aggregates for a viewport, served from the cache where possible."""
+    cells = cells_in_bbox(zoom, bbox)
+    if not use_cache:
+        return aggregate_cells(queryset, zoom, cells)
+
+    keys = {cell: get_cluster_cell_cache_key(zoom, *cell) for cell in cells}
+    cached = cache.get_many(keys.values())
+    aggregates = {cell: cached[key] for cell, key in keys.items() if key in cached}
+
+    missing = [cell for cell in cells if cell not in aggregates]
+    computed = aggregate_cells(queryset, zoom, missing)
+    if computed:
+        cache.set_many(
+            {keys[cell]: aggregate for cell, aggregate in computed.items()},
+            timeout=CLUSTER_CELL_TIMEOUT,
+        )
+    aggregates.update(computed)
+    return aggregates
+
+
+def serialize_clusters(zoom, aggregates):
+    clusters = []
+    for (x, y), aggregate in sorted(aggregates.items()):
+        count = aggregate["count"]
+        if not count:
+            continue
+        clusters.append(
+            {
+                "zoom": zoom,
+                "x": x,
+                "y": y,
+                "bounds": cell_bounds(zoom, x, y),
+                "count": count,
+                "latitude": aggregate["lat_sum"] / count,
+                "longitude": aggregate["lng_sum"] / count,
+                "average_rating": round(aggregate["rating_sum"] / count, 1),
+                "categories": aggregate["categories"],
+            }
+        )
+    return clusters
@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .filters import LocationFilter
+from .models import ExportFormat, Location, Review
+from .search import search_locations
+
+EXPORT_FILTER_FIELDS = ("search", "category", "min_rating", "max_rating")
+
+LOCATION_EXPORT_COLUMNS = (
+    ("Title", "title"),
+    ("Description", "description"),
+    ("Address", "address"),
+    ("Category", "category"),
+    ("Average Rating", "average_rating"),
+    ("Created At", "created_at"),
+    ("Updated At", "updated_at"),
+)
+
+
+LOCATION_JSON_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "address",
+    "category",
+    "latitude",
+    "longitude",
+    "created_at",
+    "updated_at",
+    "average_rating",
+    "popularity",
+)
+
+# Output key -> values() lookup, matching the shape of ReviewSerializer.
+REVIEW_JSON_FIELDS = {
+    "id": "id",
+    "email": "user__email",
+    "rating": "rating",
+    "comment": "comment",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "likes_count": "likes_count",
+    "dislikes_count": "dislikes_count",
+}
+
+EXPORT_FILE_EXTENSIONS = {
+    ExportFormat.CSV.value: "csv",
+    ExportFormat.JSONL.value: "jsonl",
+    ExportFormat.PARQUET.value: "parquet",
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_locations_csv(queryset, chunk_size=2000):
+    """Yield the CSV export of ``queryset`` in blocks of ``chunk_size`` rows.
+
+    Rows are read as tuples through a server-side cursor, so memory stays
+    flat regardless of how many locations are exported.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in LOCATION_EXPORT_COLUMNS])
+
+    fields = [field for _, field in LOCATION_EXPORT_COLUMNS]
+    rows = queryset.order_by().values_list(*fields).iterator(chunk_size=chunk_size)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+    if buffer:
+        yield "".join(buffer)
+
+
+def _dump_json(value):
+    return json.dumps(
+        value, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def _attach_reviews(locations):
+    """Fetch the reviews of a batch of locations with one values() query."""
+    reviews_by_location = {location["id"]: [] for location in locations}
+    lookups = list(REVIEW_JSON_FIELDS.values())
+    rows = (
+        Review.objects.filter(location_id__in=reviews_by_location)
+        .order_by("location_id", "id")
+        .values_list("location_id", *lookups)
+    )
+    for location_id, *values in rows:
+        reviews_by_location[location_id].append(dict(zip(REVIEW_JSON_FIELDS, values)))
+    for location in locations:
+        location["reviews"] = reviews_by_location[location["id"]]
+    return locations
+
+
+def _iter_location_batches(queryset, chunk_size):
+    """Yield lists of location dicts, each with its reviews attached.
+
+    Costs one query for the locations plus one review query per batch, so the
+    query count grows with rows / chunk_size rather than with rows.
+    """
+    rows = (
+        queryset.order_by("id")
+        .values(*LOCATION_JSON_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield _attach_reviews(batch)
+            batch = []
+    if batch:
+        yield _attach_reviews(batch)
+
+
+def iter_locations_ndjson(queryset, chunk_size=500):
+    """Yield the export as newline-delimited JSON, one location per line."""
+    for batch in _iter_location_batches(queryset, chunk_size):
+        yield "".join(f"{_dump_json(location)}\n" for location in batch)
+
+
+def iter_locations_json_array(queryset, chunk_size=500):
+    """Yield the export as a single JSON array, streamed batch by batch."""
+    yield "["
+    separator = ""
+    for batch in _iter_location_batches(queryset, chunk_size):
+        yield separator + ",".join(_dump_json(location) for location in batch)
+        separator = ","
+    yield "]"
+
+
+def build_export_queryset(filters):
+    """Apply the list endpoint's search/category/rating filters outside a request."""
+    queryset = Location.objects.all()
+    search = filters.get("search", "").strip()
+    if search:
+        queryset = search_locations(queryset, search)
+    return LocationFilter(data=filters, queryset=queryset).qs
+
+
+def _iter_location_rows(queryset, chunk_size):
+    fields = [field for _, field in LOCATION_EXPORT_COLUMNS]
+    return fields, queryset.order_by().values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _write_csv(queryset, path, chunk_size):
+    with open(path, "w", newline="") as output:
+        for block in iter_locations_csv(queryset, chunk_size=chunk_size):
+            output.write(block)
+
+
+def _write_jsonl(queryset, path, chunk_size):
+    fields, rows = _iter_location_rows(queryset, chunk_size)
+    with open(path, "w") as output:
+        for row in rows:
+            output.write(_dump_json(dict(zip(fields, row))))
+            output.write("\n")
+
+
+def _write_parquet(queryset, path, chunk_size):
+    """Write one row group per ``chunk_size`` rows, holding a single chunk in memory."""
+    # Imported here: only the parquet format needs pyarrow.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields, rows = _iter_location_rows(queryset, chunk_size)
+    column_types = {
+        "average_rating": pa.float64(),
+        "created_at": pa.timestamp("us", tz="UTC"),
+        "updated_at": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(field, column_types.get(field, pa.string())) for field in fields])
+
+    def write_batch(writer, batch):
+        columns = [
+            pa.array(column, type=schema.field(index).type)
+            for index, column in enumerate(zip(*batch))
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                write_batch(writer, batch)
+                batch = []
+        if batch:
+            write_batch(writer, batch)
+
+
+_WRITERS = {
+    ExportFormat.CSV.value: _write_csv,
+    ExportFormat.JSONL.value: _write_jsonl,
+    ExportFormat.PARQUET.value: _write_parquet,
+}
+
+
+def write_locations_export(queryset, export_format, path, chunk_size=2000):
+    """Write the export to a temporary file and move it into place once complete."""
+    tmp_path = f"{path}.part"
+    try:
+        _WRITERS[export_format](queryset, tmp_path, chunk_size)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
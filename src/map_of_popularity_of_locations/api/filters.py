@@ -1,11 +1,55 @@
 import django_filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .geo import filter_bbox, filter_within_radius
 from .models import Location
+from .search import search_locations
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 500
+
+
+class NumberCSVFilter(django_filters.BaseCSVFilter, django_filters.NumberFilter):
+    pass
+
 
 class LocationFilter(django_filters.FilterSet):
     min_rating = django_filters.NumberFilter(field_name="average_rating", lookup_expr='gte')
     max_rating = django_filters.NumberFilter(field_name="average_rating", lookup_expr='lte')
     category = django_filters.CharFilter(field_name="category")
+    bbox = NumberCSVFilter(method="filter_bbox", help_text="min_lng,min_lat,max_lng,max_lat")
+    near = NumberCSVFilter(method="filter_near", help_text="lat,lng")
+    radius_km = django_filters.NumberFilter(method="filter_radius_km")
     
     class Meta:
         model = Location
-        fields = ['min_rating', 'max_rating', 'category']
\ No newline at end of file
+        fields = ['min_rating', 'max_rating', 'category', 'bbox', 'near', 'radius_km']
+
+    def filter_bbox(self, queryset, name, value):
+        if len(value) != 4:
+            raise ValidationError({"bbox": "Expected min_lng,min_lat,max_lng,max_lat."})
+        min_lng, min_lat, max_lng, max_lat = (float(item) for item in value)
+        return filter_bbox(queryset, min_lng, min_lat, max_lng, max_lat)
+
+    def filter_near(self, queryset, name, value):
+        if len(value) != 2:
+            raise ValidationError({"near": "Expected lat,lng."})
+        lat, lng = (float(item) for item in value)
+        radius_km = float(self.form.cleaned_data.get("radius_km") or DEFAULT_RADIUS_KM)
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValidationError({"radius_km": f"Must be between 0 and {MAX_RADIUS_KM}."})
+        return filter_within_radius(queryset, lat, lng, radius_km)
+
+    def filter_radius_km(self, queryset, name, value):
+        # Consumed by filter_near; a radius without a center does not filter.
+        return queryset
+
+
+class LocationSearchFilter(BaseFilterBackend):
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return search_locations(queryset, query)
@@ -0,0 +1,50 @@
+import math
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def filter_bbox(queryset, min_lng, min_lat, max_lng, max_lat):
+    """Locations inside a viewport; a box with min_lng > max_lng crosses the antimeridian."""
+    queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lng <= max_lng:
+        return queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    return queryset.filter(Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng))
+
+
+def haversine_distance_km(lat, lng):
+    """Great-circle distance in km from (lat, lng) to each row, as an SQL expression."""
+    lat_rad = math.radians(lat)
+    lng_rad = math.radians(lng)
+    half_dlat = Sin((Radians(F("latitude")) - lat_rad) / 2)
+    half_dlng = Sin((Radians(F("longitude")) - lng_rad) / 2)
+    a = Power(half_dlat, 2) + math.cos(lat_rad) * Cos(Radians(F("latitude"))) * Power(
+        half_dlng, 2
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def filter_within_radius(queryset, lat, lng, radius_km):
+    """Locations within ``radius_km`` of a point, annotated with ``distance``.
+
+    The bounding box of the circle is applied first so the (latitude, longitude)
+    index narrows the rows before the haversine distance is computed.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(lat)), 1e-6)
+    queryset = queryset.filter(
+        latitude__gte=lat - lat_delta, latitude__lte=lat + lat_delta
+    )
+    if lng_delta < 180:
+        queryset = filter_bbox(
+            queryset,
+            (lng - lng_delta + 180) % 360 - 180,
+            -90,
+            (lng + lng_delta + 180) % 360 - 180,
+            90,
+        )
+    return queryset.annotate(distance=haversine_distance_km(lat, lng)).filter(
+        distance__lte=radius_km
+    )
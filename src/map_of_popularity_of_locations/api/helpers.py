@@ -1,24 +1,144 @@
-def get_location_list_cache_key(search_param="", category_param=""):
-    return f"locations:list:{search_param}:{category_param}"
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+LOCATION_LIST_NAMESPACE = "locations:list"
+LOCATION_EXPORT_NAMESPACE = "locations:export"
+
+
+def get_location_reviews_namespace(location_id):
+    return f"reviews:location:{location_id}"
+
+
+def get_subscribed_reviews_namespace(user_id):
+    return f"reviews:user:{user_id}:subscribed"
+
+
+def get_cache_generation(namespace):
+    """Current generation of a namespace; every key built under it embeds this value."""
+    return cache.get_or_set(f"generation:{namespace}", time.time_ns, timeout=None)
+
+
+async def aget_cache_generation(namespace):
+    return await cache.aget_or_set(f"generation:{namespace}", time.time_ns, timeout=None)
+
+
+def bump_cache_generation(namespace):
+    """Orphan every key of a namespace with a single INCR instead of a SCAN."""
+    generation_key = f"generation:{namespace}"
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        # An evicted counter restarts from the clock so it never reuses an old generation.
+        cache.set(generation_key, time.time_ns(), timeout=None)
+
+
+def get_query_params_digest(query_params):
+    """Stable digest of the non-empty query params, independent of their order."""
+    items = sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        for value in values
+        if value != ""
+    )
+    if not items:
+        return ""
+    return hashlib.md5(urlencode(items).encode()).hexdigest()
+
+
+def get_export_filters_digest(filters):
+    """Digest of an export filter set; identical filter sets share one file."""
+    normalized = {key: str(value) for key, value in filters.items() if value not in ("", None)}
+    return hashlib.md5(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def get_location_list_cache_key(params_digest=""):
+    generation = get_cache_generation(LOCATION_LIST_NAMESPACE)
+    return f"{LOCATION_LIST_NAMESPACE}:v{generation}:{params_digest}"
+
+
+async def aget_location_list_cache_key(params_digest=""):
+    generation = await aget_cache_generation(LOCATION_LIST_NAMESPACE)
+    return f"{LOCATION_LIST_NAMESPACE}:v{generation}:{params_digest}"
 
 
 def get_location_detail_cache_key(location_id):
     return f"location:detail:{location_id}"
 
 
-def get_reviews_cache_key(location_id, user_id=None):
-    if user_id:
-        return f"reviews:location:{location_id}:user:{user_id}"
-    return f"reviews:location:{location_id}"
+def get_reviews_cache_key(location_id, params_digest=""):
+    namespace = get_location_reviews_namespace(location_id)
+    generation = get_cache_generation(namespace)
+    return f"{namespace}:v{generation}:list:{params_digest}"
+
+
+async def aget_reviews_cache_key(location_id, params_digest=""):
+    namespace = get_location_reviews_namespace(location_id)
+    generation = await aget_cache_generation(namespace)
+    return f"{namespace}:v{generation}:list:{params_digest}"
+
+
+def get_review_detail_cache_key(location_id, review_id):
+    namespace = get_location_reviews_namespace(location_id)
+    generation = get_cache_generation(namespace)
+    return f"{namespace}:v{generation}:detail:{review_id}"
+
+
+def get_subscribed_locations_cache_key(user_id):
+    namespace = get_subscribed_reviews_namespace(user_id)
+    generation = get_cache_generation(namespace)
+    return f"{namespace}:v{generation}:locations"
+
+
+def get_subscribed_reviews_cache_key(user_id, location_ids, params_digest=""):
+    """Key of a user's subscribed feed.
+
+    Subscription changes bump the user's namespace; the key also embeds the
+    review generation of every subscribed location, so a new review or vote
+    there orphans the feed too.
+    """
+    namespace = get_subscribed_reviews_namespace(user_id)
+    generation = get_cache_generation(namespace)
+    generation_keys = {
+        f"generation:{get_location_reviews_namespace(location_id)}": location_id
+        for location_id in location_ids
+    }
+    generations = cache.get_many(generation_keys)
+    for key, location_id in generation_keys.items():
+        if key not in generations:
+            generations[key] = get_cache_generation(get_location_reviews_namespace(location_id))
+    locations_digest = hashlib.md5(
+        json.dumps(sorted(generations.items())).encode()
+    ).hexdigest()
+    return f"{namespace}:v{generation}:{locations_digest}:{params_digest}"
 
 
 def get_subscription_cache_key(user_id, location_id):
     return f"subscription:{user_id}:{location_id}"
 
 
-def get_export_csv_cache_key():
-    return "locations:export:csv"
+def get_cluster_cell_cache_key(zoom, x, y):
+    return f"clusters:{zoom}:{x}:{y}"
 
 
 def get_likes_dislikes_cache_key(review_id):
     return f"review:{review_id}:likes_dislikes"
+
+
+def invalidate_location_list_caches():
+    bump_cache_generation(LOCATION_LIST_NAMESPACE)
+
+
+def invalidate_location_review_caches(location_id):
+    """Drop every payload that embeds the reviews of a location."""
+    bump_cache_generation(get_location_reviews_namespace(location_id))
+    cache.delete(get_location_detail_cache_key(location_id))
+    invalidate_location_list_caches()
+
+
+def invalidate_location_exports():
+    """Stop reusing generated export files; the next request for a filter set regenerates it."""
+    bump_cache_generation(LOCATION_EXPORT_NAMESPACE)
@@ -0,0 +1,138 @@
+from django.core.cache import caches
+from django_redis import get_redis_connection
+
+from .models import Category, Location
+
+# Metric -> Location field the sorted sets are scored by.
+LEADERBOARD_METRICS = {
+    "rating": "average_rating",
+    "popularity": "popularity",
+}
+GLOBAL_LEADERBOARD = "all"
+LEADERBOARD_SYNC_CHUNK_SIZE = 1000
+# Redis of the boards, apart from the flushable, evictable response cache.
+LEADERBOARD_CACHE_ALIAS = "leaderboards"
+# Set by a full rebuild; missing after a flush or eviction, when reads fall back to the table.
+LEADERBOARD_READY_KEY = "leaderboard:ready"
+LEADERBOARD_REBUILD_LOCK_KEY = "leaderboard:rebuild-lock"
+LEADERBOARD_REBUILD_LOCK_TIMEOUT = 300
+
+
+def get_leaderboard_connection():
+    return get_redis_connection(LEADERBOARD_CACHE_ALIAS)
+
+
+def get_leaderboard_key(metric, category=None):
+    return f"leaderboard:{metric}:{category or GLOBAL_LEADERBOARD}"
+
+
+def _all_leaderboard_keys(metric):
+    return [get_leaderboard_key(metric)] + [
+        get_leaderboard_key(metric, category.name) for category in Category
+    ]
+
+
+def _add_scores(pipeline, rows, key_suffix=""):
+    for pk, category, *scores in rows:
+        for metric, score in zip(LEADERBOARD_METRICS, scores):
+            pipeline.zadd(get_leaderboard_key(metric) + key_suffix, {pk: score})
+            pipeline.zadd(get_leaderboard_key(metric, category) + key_suffix, {pk: score})
+
+
+def sync_location_leaderboards(location_ids):
+    """Re-score the given locations from the database, dropping deleted ones.
+
+    Every category board loses the members first, so a category change moves a
+    location instead of listing it twice.
+    """
+    location_ids = list(location_ids)
+    if not location_ids:
+        return
+    rows = Location.objects.filter(pk__in=location_ids).values_list(
+        "pk", "category", *LEADERBOARD_METRICS.values()
+    )
+    with get_leaderboard_connection().pipeline() as pipeline:
+        for metric in LEADERBOARD_METRICS:
+            for key in _all_leaderboard_keys(metric):
+                pipeline.zrem(key, *location_ids)
+        _add_scores(pipeline, rows)
+        pipeline.execute()
+
+
+def rebuild_leaderboards(chunk_size=LEADERBOARD_SYNC_CHUNK_SIZE):
+    """Rebuild every board from the table into temporary keys and swap them in."""
+    connection = get_leaderboard_connection()
+    suffix = ":rebuild"
+    keys = [key for metric in LEADERBOARD_METRICS for key in _all_leaderboard_keys(metric)]
+    connection.delete(*(key + suffix for key in keys))
+
+    rows = Location.objects.order_by().values_list(
+        "pk", "category", *LEADERBOARD_METRICS.values()
+    )
+    total = 0
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            total += _write_batch(connection, batch, suffix)
+            batch = []
+    total += _write_batch(connection, batch, suffix)
+
+    with connection.pipeline(transaction=False) as pipeline:
+        for key in keys:
+            pipeline.exists(key + suffix)
+        built = pipeline.execute()
+    with connection.pipeline() as pipeline:
+        # RENAME replaces the live board atomically but fails on a missing source,
+        # e.g. a category without locations, whose board is just dropped.
+        for key, exists in zip(keys, built):
+            if exists:
+                pipeline.rename(key + suffix, key)
+            else:
+                pipeline.delete(key)
+        pipeline.set(LEADERBOARD_READY_KEY, 1)
+        pipeline.execute()
+    return total
+
+
+def _write_batch(connection, batch, key_suffix):
+    if not batch:
+        return 0
+    with connection.pipeline(transaction=False) as pipeline:
+        _add_scores(pipeline, batch, key_suffix)
+        pipeline.execute()
+    return len(batch)
+
+
+def get_top_location_ids(metric, category=None, limit=10):
+    """Ids of the best ``limit`` locations, best first, straight from ZREVRANGE.
+
+    Boards that were flushed or evicted are answered from the table while a
+    rebuild is scheduled, instead of coming back empty.
+    """
+    with get_leaderboard_connection().pipeline(transaction=False) as pipeline:
+        pipeline.exists(LEADERBOARD_READY_KEY)
+        pipeline.zrevrange(get_leaderboard_key(metric, category), 0, limit - 1)
+        ready, members = pipeline.execute()
+    if ready:
+        return [int(member) for member in members]
+
+    schedule_leaderboard_rebuild()
+    field = LEADERBOARD_METRICS[metric]
+    queryset = Location.objects.all()
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    return list(
+        queryset.order_by(f"-{field}", "-id").values_list("pk", flat=True)[:limit]
+    )
+
+
+def schedule_leaderboard_rebuild():
+    """Queue one full rebuild, however many requests find the boards missing."""
+    if caches[LEADERBOARD_CACHE_ALIAS].add(
+        LEADERBOARD_REBUILD_LOCK_KEY, True, timeout=LEADERBOARD_REBUILD_LOCK_TIMEOUT
+    ):
+        # Imported here: the tasks module imports this one.
+        from .tasks import rebuild_location_leaderboards
+
+        rebuild_location_leaderboards.delay()
@@ -0,0 +1,476 @@
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.test import APIClient
+
+from api.leaderboards import LEADERBOARD_CACHE_ALIAS
+from api.models import Category, LikeDislike, Location, LocationSubscription, Review
+from locations.metrics import RequestMetrics
+from registration.tokens import ACCESS_TOKEN, issue_tokens
+
+SEED_BATCH_SIZE = 5000
+
+# Scenario -> (method, path template). {location} and {review} are filled with
+# seeded ids drawn from the --seed random generator.
+SCENARIOS = {
+    "locations_list": ("GET", "/api/v1/locations/"),
+    "locations_list_expanded": ("GET", "/api/v1/locations/?expand=reviews"),
+    "locations_retrieve": ("GET", "/api/v1/locations/{location}/"),
+    "locations_export_csv": ("GET", "/api/v1/locations/export/csv/"),
+    "locations_export_json": ("GET", "/api/v1/locations/export/json/"),
+    "reviews_list": ("GET", "/api/v1/locations/{location}/reviews/"),
+    "reviews_create": ("POST", "/api/v1/locations/{location}/reviews/"),
+    "subscribed_feed": ("GET", "/api/v1/reviews/subscribed/"),
+    "likes_get": ("GET", "/api/v1/reviews/{review}/like_dislike/"),
+    "likes_post": ("POST", "/api/v1/reviews/{review}/like_dislike/"),
+    # api.async_views counterparts of the read paths above.
+    "async_locations_list": ("GET", "/api/v1/async/locations/"),
+    "async_locations_retrieve": ("GET", "/api/v1/async/locations/{location}/"),
+    "async_reviews_list": ("GET", "/api/v1/async/locations/{location}/reviews/"),
+    "async_likes_get": ("GET", "/api/v1/async/reviews/{review}/like_dislike/"),
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(int(len(ordered) * percent / 100 + 0.5), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestClientDriver:
+    """Requests through the Django test client, inside this process."""
+
+    name = "client"
+
+    def __init__(self, token):
+        self.token = token
+        self._local = threading.local()
+
+    def request(self, method, path, data):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        # Counted here rather than by the middleware so the queries of a
+        # streaming body, which run while it is consumed, are included.
+        metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.record_query))
+            response = client.generic(
+                method, path, json.dumps(data) if data else "", content_type="application/json"
+            )
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, metrics.sql_queries, len(body)
+
+    def close(self):
+        pass
+
+
+class LiveServerDriver:
+    """Real HTTP requests against a threaded WSGI server on localhost.
+
+    Query counts come from the X-SQL-Queries header, so they leave out the
+    queries a streaming body runs after the headers were sent.
+    """
+
+    name = "wsgi"
+
+    def __init__(self, token):
+        self.token = token
+        self.server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler)
+        self.server.set_app(get_wsgi_application())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, method, path, data):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(data).encode() if data else None,
+            method=method,
+            headers={"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, headers, body = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            status, headers, body = error.code, error.headers, error.read()
+        queries = headers.get("X-SQL-Queries")
+        return status, int(queries) if queries is not None else None, len(body)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class ASGIServerDriver(LiveServerDriver):
+    """Real HTTP requests against Uvicorn serving ``locations.asgi`` on localhost."""
+
+    name = "asgi"
+
+    def __init__(self, token):
+        import uvicorn
+
+        self.token = token
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.server = uvicorn.Server(
+            uvicorn.Config(get_asgi_application(), host="127.0.0.1", port=port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def close(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+DRIVERS = {
+    driver.name: driver for driver in (TestClientDriver, LiveServerDriver, ASGIServerDriver)
+}
+
+# Report of a run with the default options, compared with unless --no-baseline.
+# Its timings come from another machine, so by default only its query counts
+# fail a run. Refresh it with --save-baseline whenever a change is meant to
+# move the numbers.
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "benchmark_api_baseline.json")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a reproducible dataset and measure throughput, p50/p95/p99 latency, SQL "
+        "queries and peak RSS of the API hot paths; optionally compare with a baseline. "
+        "Flushes the database, so it only runs with locations.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--locations", type=int, default=200)
+        parser.add_argument("--reviews", type=int, default=10, help="Reviews per location.")
+        parser.add_argument("--likes", type=int, default=5, help="Likes/dislikes per review.")
+        parser.add_argument("--subscribers", type=int, default=3, help="Subscribers per location.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--server",
+            choices=sorted(DRIVERS),
+            default="client",
+            help="Drive the Django test client, or a WSGI or ASGI (Uvicorn) server on localhost.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=sorted(SCENARIOS),
+            help="Scenario to run; repeatable (default: all).",
+        )
+        parser.add_argument("--output", help="Also write the JSON report to this file.")
+        parser.add_argument(
+            "--baseline",
+            help=(
+                "Compare with a report stored by --save-baseline on this machine, failing on "
+                "query, latency, throughput and RSS regressions. Default: the committed "
+                "baseline, failing on query regressions and only reporting the rest."
+            ),
+        )
+        parser.add_argument(
+            "--no-baseline",
+            action="store_false",
+            dest="compare",
+            help="Do not compare with any baseline.",
+        )
+        parser.add_argument("--save-baseline", help="Store this report as the new baseline.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed relative regression of latency, throughput and RSS.",
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "BENCHMARK_DATABASE", False):
+            raise CommandError(
+                "benchmark_api flushes the database; run it with "
+                "DJANGO_SETTINGS_MODULE=locations.settings_benchmark."
+            )
+
+        rng = random.Random(options["seed"])
+        self._prepare_database()
+        user, location_ids, review_ids = self._seed(rng, options)
+
+        token = issue_tokens(user)[ACCESS_TOKEN]
+        driver = DRIVERS[options["server"]](token)
+        try:
+            scenarios = {}
+            for name in options["scenarios"] or SCENARIOS:
+                calls = self._build_calls(
+                    rng, name, location_ids, review_ids, options["warmup"] + options["requests"]
+                )
+                scenarios[name] = self._measure(
+                    driver, calls[: options["warmup"]], calls[options["warmup"]:], options["concurrency"]
+                )
+        finally:
+            driver.close()
+
+        report = {
+            "config": {
+                key: options[key]
+                for key in (
+                    "locations", "reviews", "likes", "subscribers", "seed",
+                    "requests", "warmup", "concurrency", "server",
+                )
+            },
+            "environment": {
+                "database": connections[DEFAULT_DB_ALIAS].vendor,
+                "cache": settings.CACHES["default"]["LOCATION"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+            },
+            "scenarios": scenarios,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+        regressions = None
+        baseline = self._load_baseline(report, options) if options["compare"] else None
+        if baseline is not None:
+            regressions, timing_regressions = self._compare(report, baseline, options["tolerance"])
+            if options["baseline"]:
+                regressions += timing_regressions
+            elif timing_regressions:
+                report["timing_changes"] = timing_regressions
+                self.stderr.write(
+                    f"{len(timing_regressions)} latency/throughput/RSS change(s) beyond the "
+                    "tolerance; not failing on timings of the committed baseline."
+                )
+            report["regressions"] = regressions
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        for path in filter(None, (options["output"], options["save_baseline"])):
+            with open(path, "w") as report_file:
+                report_file.write(output + "\n")
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} regression(s) against {options['baseline'] or DEFAULT_BASELINE}."
+            )
+
+    def _prepare_database(self):
+        call_command("migrate", run_syncdb=True, interactive=False, verbosity=0)
+        call_command("flush", interactive=False, verbosity=0)
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def _seed(self, rng, options):
+        User = get_user_model()
+        user_count = max(options["reviews"], options["likes"], options["subscribers"], 1)
+        users = User.objects.bulk_create(
+            User(username=f"benchmark{i}", email=f"benchmark{i}@example.com")
+            for i in range(user_count)
+        )
+        categories = [category.name for category in Category]
+        locations = Location.objects.bulk_create(
+            (
+                Location(
+                    title=f"Location {i}",
+                    description=f"Seeded location {i}",
+                    address=f"Street {i}",
+                    category=rng.choice(categories),
+                    latitude=rng.uniform(44.0, 52.0),
+                    longitude=rng.uniform(22.0, 40.0),
+                )
+                for i in range(options["locations"])
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+        reviews = Review.objects.bulk_create(
+            (
+                Review(
+                    user=users[j],
+                    location=location,
+                    rating=rng.randint(0, 10),
+                    comment=f"Seeded review {j}",
+                )
+                for location in locations
+                for j in range(options["reviews"])
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+        LikeDislike.objects.bulk_create(
+            (
+                LikeDislike(user=users[k], review=review, is_like=rng.random() < 0.7)
+                for review in reviews
+                for k in range(options["likes"])
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+        LocationSubscription.objects.bulk_create(
+            (
+                LocationSubscription(user=subscriber, location=location)
+                for location in locations
+                for subscriber in rng.sample(users, min(options["subscribers"], user_count))
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        # bulk_create skips the signals that keep the denormalized columns current.
+        for command in ("rebuild_review_counters", "reconcile_location_ratings", "rebuild_leaderboards"):
+            call_command(command, stdout=StringIO())
+        # Start cold, but keep the boards rebuilt just above.
+        for alias in settings.CACHES:
+            if alias != LEADERBOARD_CACHE_ALIAS:
+                caches[alias].clear()
+        return users[0], [location.pk for location in locations], [review.pk for review in reviews]
+
+    @staticmethod
+    def _build_calls(rng, name, location_ids, review_ids, count):
+        method, template = SCENARIOS[name]
+        calls = []
+        for _ in range(count):
+            path = template.format(
+                location=rng.choice(location_ids) if location_ids else 0,
+                review=rng.choice(review_ids) if review_ids else 0,
+            )
+            data = None
+            if name == "reviews_create":
+                data = {"rating": rng.randint(0, 10), "comment": "Benchmark review"}
+            elif name == "likes_post":
+                data = {"is_like": rng.random() < 0.7}
+            calls.append((method, path, data))
+        return calls
+
+    @staticmethod
+    def _measure(driver, warmup, calls, concurrency):
+        for call in warmup:
+            driver.request(*call)
+
+        def timed(call):
+            started = time.perf_counter()
+            status, queries, size = driver.request(*call)
+            return time.perf_counter() - started, status, queries, size
+
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(timed, calls))
+        else:
+            results = [timed(call) for call in calls]
+        elapsed = time.perf_counter() - started
+        # Threads of the pool leave their connections open.
+        connections.close_all()
+
+        latencies = sorted(result[0] for result in results)
+        queries = [result[2] for result in results if result[2] is not None]
+        return {
+            "requests": len(results),
+            "errors": sum(1 for result in results if result[1] >= 400),
+            "requests_per_second": round(len(results) / elapsed, 1) if elapsed else None,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+            "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "bytes_mean": round(sum(result[3] for result in results) / len(results)),
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+    def _load_baseline(self, report, options):
+        """The stored report to compare with, or None to skip the comparison.
+
+        A baseline given explicitly must match the options of this run. The
+        default one is only compared with runs of the default options.
+        """
+        explicit = options["baseline"] is not None
+        path = options["baseline"] or DEFAULT_BASELINE
+        if not explicit and not os.path.exists(path):
+            self.stderr.write(f"No baseline at {path}; not comparing.")
+            return None
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        changed = sorted(
+            key for key, value in report["config"].items() if baseline["config"].get(key) != value
+        )
+        if changed:
+            message = f"{path} was recorded with different options: {', '.join(changed)}."
+            if explicit:
+                raise CommandError(message)
+            self.stderr.write(f"{message} Not comparing; pass --baseline or --no-baseline.")
+            return None
+        return baseline
+
+    @staticmethod
+    def _compare(report, baseline, tolerance):
+        """Query and timing regressions of this report against a stored one.
+
+        Returns two lists of readable strings. Query counts must not grow at
+        all; latency, throughput and RSS may move by ``tolerance`` to absorb
+        machine noise.
+        """
+        query_regressions, timing_regressions = [], []
+
+        def check(label, current, previous, higher_is_worse=True, exact=False):
+            if current is None or previous is None:
+                return
+            allowed = 0 if exact else tolerance
+            if higher_is_worse:
+                worse = current > previous * (1 + allowed)
+            else:
+                worse = current < previous * (1 - allowed)
+            if worse:
+                found = query_regressions if exact else timing_regressions
+                found.append(f"{label}: {previous} -> {current}")
+
+        for name, result in report["scenarios"].items():
+            previous = baseline.get("scenarios", {}).get(name)
+            if previous is None:
+                continue
+            check(f"{name} queries_max", result["queries_max"], previous.get("queries_max"), exact=True)
+            check(f"{name} p95_ms", result["p95_ms"], previous.get("p95_ms"))
+            check(f"{name} p99_ms", result["p99_ms"], previous.get("p99_ms"))
+            check(
+                f"{name} requests_per_second",
+                result["requests_per_second"],
+                previous.get("requests_per_second"),
+                higher_is_worse=False,
+            )
+        check("peak_rss_mb", report["peak_rss_mb"], baseline.get("peak_rss_mb"))
+        return query_regressions, timing_regressions
@@ -0,0 +1,106 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+from api.models import LocationSubscription, Review
+from locations.db.postgresql.base import acquire_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure request throughput under concurrency for several CONN_MAX_AGE values, "
+        "replaying the tiny queries of subscribe and LikeDislikeView."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per thread.")
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            action="append",
+            dest="conn_max_ages",
+            help="CONN_MAX_AGE to benchmark; repeatable (default: 0 and 60).",
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        original_max_age = settings_dict["CONN_MAX_AGE"]
+        report = {}
+        try:
+            for max_age in options["conn_max_ages"] or [0, 60]:
+                settings_dict["CONN_MAX_AGE"] = max_age
+                connections.close_all()
+                report[f"conn_max_age={max_age}"] = self._measure(options["threads"], options["requests"])
+        finally:
+            settings_dict["CONN_MAX_AGE"] = original_max_age
+
+        self.stdout.write(
+            json.dumps(
+                {
+                    "vendor": connections[DEFAULT_DB_ALIAS].vendor,
+                    "threads": options["threads"],
+                    "requests_per_thread": options["requests"],
+                    "results": report,
+                },
+                indent=2,
+            )
+        )
+
+    def _measure(self, threads, requests):
+        opened = []
+        lock = threading.Lock()
+
+        def count_connection(sender, connection, **kwargs):
+            with lock:
+                opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        acquire_stats.reset()
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                latencies = [
+                    latency
+                    for thread_latencies in executor.map(self._worker, [requests] * threads)
+                    for latency in thread_latencies
+                ]
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+
+        latencies.sort()
+        acquired = acquire_stats.snapshot()
+        return {
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+            "connections_opened": len(opened),
+            "acquire_total_ms": acquired["total_ms"],
+            "acquire_max_ms": acquired["max_ms"],
+        }
+
+    def _worker(self, requests):
+        latencies = []
+        try:
+            for _ in range(requests):
+                latencies.append(self._request())
+        finally:
+            connections.close_all()
+        return latencies
+
+    @staticmethod
+    def _request():
+        # request_started / request_finished run close_old_connections the same way.
+        started = time.perf_counter()
+        close_old_connections()
+        LocationSubscription.objects.filter(user_id=0, location_id=0).exists()
+        Review.objects.filter(pk=0).values("likes_count", "dislikes_count").first()
+        close_old_connections()
+        return time.perf_counter() - started
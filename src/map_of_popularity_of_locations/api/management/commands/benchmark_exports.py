@@ -0,0 +1,85 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Location, Review
+
+EXPORT_PATHS = {
+    "export_json": "/api/v1/locations/export/json/",
+    "export_ndjson": "/api/v1/locations/export/ndjson/",
+    "export_json_array": "/api/v1/locations/export/ndjson/?array=true",
+}
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and query counts of the serializer and streaming JSON exports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--locations",
+            type=int,
+            default=0,
+            help="Seed this many locations first; the seed data is rolled back afterwards.",
+        )
+        parser.add_argument("--reviews", type=int, default=5, help="Reviews per seeded location.")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._benchmark_user()
+            if options["locations"]:
+                self._seed(user, options["locations"], options["reviews"])
+
+            client = APIClient()
+            client.force_authenticate(user)
+            rows = Location.objects.count()
+            report = {
+                name: self._measure(client, path, rows, options["repeat"])
+                for name, path in EXPORT_PATHS.items()
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({"locations": rows, "results": report}, indent=2))
+
+    def _benchmark_user(self):
+        User = get_user_model()
+        user, _ = User.objects.get_or_create(
+            username="benchmark", defaults={"email": "benchmark@example.com"}
+        )
+        return user
+
+    def _seed(self, user, location_count, reviews_per_location):
+        locations = Location.objects.bulk_create(
+            Location(title=f"Location {i}", description="Seeded", address=f"Street {i}")
+            for i in range(location_count)
+        )
+        Review.objects.bulk_create(
+            Review(user=user, location=location, rating=(i + j) % 11, comment="Seeded")
+            for i, location in enumerate(locations)
+            for j in range(reviews_per_location)
+        )
+
+    def _measure(self, client, path, rows, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(path)
+                body = (
+                    b"".join(response.streaming_content)
+                    if response.streaming
+                    else response.content
+                )
+                timings.append(time.perf_counter() - started)
+        best = min(timings)
+        return {
+            "best_seconds": round(best, 4),
+            "rows_per_second": round(rows / best, 1) if best else None,
+            "queries": len(queries),
+            "bytes": len(body),
+        }
@@ -0,0 +1,96 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from api.models import Location
+from api.search import (
+    ensure_search_indexes,
+    is_postgres,
+    location_search_vector,
+    search_locations,
+)
+
+SEED_SQL = """
+INSERT INTO api_location
+    (title, description, address, category, created_at, updated_at,
+     average_rating, rating_sum, rating_count,
+     likes_count, dislikes_count, activity, popularity)
+SELECT
+    'Place ' || md5(i::text) || ' ' || (ARRAY['cafe', 'park', 'museum', 'theater', 'market'])[1 + i %% 5],
+    'Seeded location number ' || i || ' near ' || md5((i * 7)::text),
+    'Street ' || (i %% 997) || ', building ' || i,
+    (ARRAY['RESTAURANT', 'PARK', 'MUSEUM', 'CAFE', 'THEATER', 'SHOP', 'OTHER'])[1 + i %% 7],
+    now(), now(), (i %% 101) / 10.0, 0, 0,
+    0, 0, 0, 0
+FROM generate_series(1, %s) AS i
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare the legacy ILIKE search with the full-text/trigram search on PostgreSQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--locations",
+            type=int,
+            default=0,
+            help="Seed this many locations first (e.g. 1000000); rolled back afterwards.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--query", action="append", dest="queries")
+
+    def handle(self, *args, **options):
+        if not is_postgres():
+            raise CommandError("The search benchmark requires PostgreSQL.")
+
+        queries = options["queries"] or ["cafe", "musuem", "place 3f"]
+        with transaction.atomic():
+            if options["locations"]:
+                ensure_search_indexes()
+                with connection.cursor() as cursor:
+                    cursor.execute(SEED_SQL, [options["locations"]])
+                Location.objects.update(search_vector=location_search_vector())
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE api_location")
+
+            report = {
+                query: {
+                    "ilike": self._measure(self._ilike_queryset(query), options["repeat"]),
+                    "full_text": self._measure(
+                        search_locations(Location.objects.all(), query).order_by(
+                            "-search_rank", "-id"
+                        ),
+                        options["repeat"],
+                    ),
+                }
+                for query in queries
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({"queries": report}, indent=2))
+
+    @staticmethod
+    def _ilike_queryset(query):
+        """The search the list endpoint ran before: title ILIKE plus SearchFilter."""
+        return (
+            Location.objects.filter(title__icontains=query)
+            .filter(Q(title__icontains=query) | Q(description__icontains=query))
+            .order_by("-created_at", "-id")
+        )
+
+    @staticmethod
+    def _measure(queryset, repeat, page_size=50):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(queryset[:page_size].values_list("id", flat=True))
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "rows": rows,
+            "median_ms": round(statistics.median(timings), 2),
+            "max_ms": round(max(timings), 2),
+        }
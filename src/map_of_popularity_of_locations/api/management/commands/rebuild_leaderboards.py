@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import LEADERBOARD_SYNC_CHUNK_SIZE, rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Redis leaderboards of locations (global and per category) from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=LEADERBOARD_SYNC_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = rebuild_leaderboards(chunk_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt leaderboards for {total} locations."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api.models import LikeDislike, Review
+
+
+def _vote_count_subquery(is_like):
+    votes = (
+        LikeDislike.objects.filter(review=OuterRef("pk"), is_like=is_like)
+        .order_by()
+        .values("review")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(votes, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized likes_count/dislikes_count columns of every review."
+
+    def handle(self, *args, **options):
+        updated = Review.objects.update(
+            likes_count=_vote_count_subquery(True),
+            dislikes_count=_vote_count_subquery(False),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt vote counters for {updated} reviews."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Location
+from api.search import ensure_search_indexes, is_postgres, location_search_vector
+
+
+class Command(BaseCommand):
+    help = "Create the search indexes and recompute Location.search_vector in id batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if not is_postgres():
+            raise CommandError("Full-text search vectors require PostgreSQL.")
+
+        ensure_search_indexes()
+        batch_size = options["batch_size"]
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Location.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += Location.objects.filter(id__gte=ids[0], id__lte=ids[-1]).update(
+                search_vector=location_search_vector()
+            )
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {updated} locations."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from api.models import Location, Review, average_rating_expression, popularity_expression
+
+
+def _review_aggregate_subquery(aggregate):
+    reviews = (
+        Review.objects.filter(location=OuterRef("pk"))
+        .order_by()
+        .values("location")
+        .annotate(total=aggregate)
+        .values("total")
+    )
+    return Coalesce(Subquery(reviews, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the rating aggregate, review vote totals and popularity "
+        "of every location from its reviews."
+    )
+
+    def handle(self, *args, **options):
+        rating_sum = _review_aggregate_subquery(Sum("rating"))
+        rating_count = _review_aggregate_subquery(Count("pk"))
+        likes_count = _review_aggregate_subquery(Sum("likes_count"))
+        dislikes_count = _review_aggregate_subquery(Sum("dislikes_count"))
+        updated = Location.objects.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            likes_count=likes_count,
+            dislikes_count=dislikes_count,
+            average_rating=average_rating_expression(rating_sum, rating_count),
+            popularity=popularity_expression(
+                rating_sum, rating_count, likes_count, dislikes_count
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reconciled ratings for {updated} locations."))
@@ -0,0 +1,159 @@
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from locations.routers import (
+    allow_replica_reads,
+    is_user_pinned_to_primary,
+    pin_user_to_primary,
+    replica_reads_enabled,
+    replicas_may_lag,
+    reset_replica_reads,
+)
+
+
+class CachedResponseMixin:
+    """Serve list/retrieve from the rendered JSON body stored in the cache.
+
+    A hit returns the stored bytes as-is, without touching the database or
+    the serializer. A miss renders normally and stores the body once the
+    response has been rendered. Subclasses provide ``get_response_cache_key``.
+
+    Responses also carry an ETag, and a request whose ``If-None-Match`` still
+    matches gets an empty 304 before the cached body is even read.
+    """
+
+    cached_actions = ("list", "retrieve")
+    response_cache_timeout = 300
+    _response_etag = None
+
+    def get_response_cache_key(self):
+        raise NotImplementedError
+
+    def get_response_etag(self, cache_key):
+        """Validator of the response body, or None for no conditional GET.
+
+        Keys that embed their namespace generation change with every write
+        that invalidates them, so by default the key itself is the validator.
+        Override for keys without a generation.
+        """
+        return hashlib.md5(cache_key.encode()).hexdigest()
+
+    def get_cached_response(self):
+        self._response_cache_key = None
+        self._response_etag = None
+        if self.action not in self.cached_actions:
+            return None
+        if getattr(self.request.accepted_renderer, "format", None) != "json":
+            return None
+
+        cache_key = self.get_response_cache_key()
+        # A body read from a lagging replica may predate the validator.
+        if not self.may_be_stale():
+            self._response_etag = self.get_response_etag(cache_key)
+        if self._response_etag is not None:
+            validators = self.add_validator_headers(HttpResponse())
+            conditional = get_conditional_response(
+                self.request, etag=quote_etag(self._response_etag), response=validators
+            )
+            # Django hands back the response it was given when no precondition applies.
+            if conditional is not validators:
+                return conditional
+
+        body = cache.get(cache_key)
+        if body is None:
+            self._response_cache_key = cache_key
+            return None
+
+        response = HttpResponse(body, content_type="application/json")
+        response["X-Cache"] = "HIT"
+        return self.add_validator_headers(response)
+
+    def add_validator_headers(self, response):
+        if self._response_etag is not None:
+            response["ETag"] = quote_etag(self._response_etag)
+            # Clients may keep the body but must revalidate it on every use.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response()
+        if cached_response is not None:
+            return cached_response
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        cached_response = self.get_cached_response()
+        if cached_response is not None:
+            return cached_response
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_key = getattr(self, "_response_cache_key", None)
+        if (
+            cache_key
+            and isinstance(response, Response)
+            and response.status_code == 200
+            and not self.may_be_stale()
+        ):
+            timeout = self.response_cache_timeout
+
+            def store_rendered_body(rendered):
+                # Must return None: a callback's return value replaces the response.
+                cache.set(cache_key, rendered.content, timeout=timeout)
+
+            response.add_post_render_callback(store_rendered_body)
+            response["X-Cache"] = "MISS"
+        if isinstance(response, Response) and response.status_code == 200:
+            self.add_validator_headers(response)
+        return response
+
+    def may_be_stale(self):
+        """Whether the response may predate a write; such bodies are not cached."""
+        return False
+
+
+class ReplicaReadMixin:
+    """Run the safe-method requests of a view against a read replica.
+
+    A user is pinned to the primary for ``REPLICA_STICKY_SECONDS`` after each of
+    their successful writes, so they always read their own writes. Goes before
+    ``CachedResponseMixin`` so replica reads taken right after a write are not cached.
+    """
+
+    reads_from_replica = False
+    _replica_reads_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        self.reads_from_replica = (
+            replica_reads_enabled()
+            and request.method in SAFE_METHODS
+            and not (user.is_authenticated and is_user_pinned_to_primary(user.pk))
+        )
+        self._replica_reads_token = allow_replica_reads(self.reads_from_replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_reads_token is not None:
+            reset_replica_reads(self._replica_reads_token)
+            self._replica_reads_token = None
+
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and user is not None
+            and user.is_authenticated
+            and 200 <= response.status_code < 300
+        ):
+            pin_user_to_primary(user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def may_be_stale(self):
+        return self.reads_from_replica and replicas_may_lag()
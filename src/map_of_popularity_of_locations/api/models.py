@@ -1,5 +1,8 @@
 from enum import Enum
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, Greatest, Ln, NullIf, Round
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -20,6 +23,50 @@ class Category(Enum):
         return [(key.name, key.value) for key in cls]
 
 
+def average_rating_expression(rating_sum, rating_count):
+    """Average rounded to one decimal, or 0.0 for a location without reviews."""
+    return Coalesce(
+        Round(
+            Cast(rating_sum, models.FloatField()) / NullIf(rating_count, 0),
+            precision=1,
+        ),
+        0.0,
+    )
+
+
+# Activity a single event adds to the decaying "trending" mass of a location.
+REVIEW_ACTIVITY_WEIGHT = 1.0
+VOTE_ACTIVITY_WEIGHT = 0.25
+# Decayed activity below this is snapped to zero so the decay job stops touching the row.
+MIN_ACTIVITY = 0.01
+
+
+def popularity_expression(
+    rating_sum=models.F("rating_sum"),
+    rating_count=models.F("rating_count"),
+    likes_count=models.F("likes_count"),
+    dislikes_count=models.F("dislikes_count"),
+    activity=models.F("activity"),
+):
+    """Bayesian-smoothed rating, scaled by review approval and recent activity.
+
+    The rating is pulled towards ``POPULARITY_PRIOR_RATING`` with the weight of
+    ``POPULARITY_PRIOR_WEIGHT`` reviews, the like ratio of the reviews is
+    Laplace-smoothed, and the time-decayed activity enters logarithmically so a
+    burst of events cannot outweigh the rating on its own. Arguments default to
+    the stored columns of the location.
+    """
+    prior_weight = settings.POPULARITY_PRIOR_WEIGHT
+    bayesian_rating = (
+        Cast(rating_sum, models.FloatField())
+        + settings.POPULARITY_PRIOR_RATING * prior_weight
+    ) / (Cast(rating_count, models.FloatField()) + prior_weight)
+    approval = (Cast(likes_count, models.FloatField()) + 1.0) / (
+        Cast(likes_count + dislikes_count, models.FloatField()) + 2.0
+    )
+    return bayesian_rating * (approval + 0.5) * Ln(activity + 2.0)
+
+
 class Location(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -34,21 +81,114 @@ class Location(models.Model):
     average_rating = models.FloatField(
         default=0.0, validators=[MinValueValidator(0), MaxValueValidator(10)]
     )
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    dislikes_count = models.PositiveIntegerField(default=0, editable=False)
+    activity = models.FloatField(default=0.0, editable=False)
+    popularity = models.FloatField(default=0.0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="location_created_id_idx"),
+            models.Index(fields=["-average_rating", "-id"], name="location_rating_id_idx"),
+            models.Index(
+                fields=["category", "-average_rating", "-id"],
+                name="location_cat_rating_id_idx",
+            ),
+            models.Index(fields=["latitude", "longitude"], name="location_lat_lng_idx"),
+            models.Index(fields=["-popularity", "-id"], name="location_popularity_id_idx"),
+            models.Index(
+                fields=["category", "-popularity", "-id"],
+                name="location_cat_pop_id_idx",
+            ),
+        ]
+
+    # Written only by the F() updates below, which leave updated_at to edits of
+    # the location itself. A full save() of an instance loaded before one of
+    # them would write its stale totals back over the delta.
+    aggregate_fields = (
+        "average_rating",
+        "rating_sum",
+        "rating_count",
+        "likes_count",
+        "dislikes_count",
+        "activity",
+        "popularity",
+    )
 
     def __str__(self):
         return self.title
 
-    def update_average_rating(self):
-        """Calculate and update the average rating based on reviews."""
-        reviews = self.reviews.all()
-        if reviews.exists():
-            average = reviews.aggregate(models.Avg("rating"))["rating__avg"]
-            self.average_rating = round(
-                average, 1
-            ) 
-        else:
-            self.average_rating = 0.0
-        self.save()
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.aggregate_fields
+                and field.attname not in deferred
+            ]
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def apply_rating_change(cls, location_id, rating_delta=0, count_delta=0, activity_delta=0):
+        """Shift the running rating aggregate and re-derive the average in one UPDATE."""
+        rating_sum = models.F("rating_sum") + rating_delta
+        rating_count = models.F("rating_count") + count_delta
+        activity = models.F("activity") + activity_delta
+        cls.objects.filter(pk=location_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            activity=activity,
+            average_rating=average_rating_expression(rating_sum, rating_count),
+            popularity=popularity_expression(rating_sum, rating_count, activity=activity),
+        )
+
+    @classmethod
+    def apply_vote_change(cls, location_id, likes=0, dislikes=0, activity_delta=0):
+        """Shift the review vote totals of a location and re-derive its popularity.
+
+        ``location_id`` may be a subquery, e.g. the location of a review.
+        """
+        likes_count = Greatest(models.F("likes_count") + likes, 0)
+        dislikes_count = Greatest(models.F("dislikes_count") + dislikes, 0)
+        activity = models.F("activity") + activity_delta
+        cls.objects.filter(pk=location_id).update(
+            likes_count=likes_count,
+            dislikes_count=dislikes_count,
+            activity=activity,
+            popularity=popularity_expression(
+                likes_count=likes_count, dislikes_count=dislikes_count, activity=activity
+            ),
+        )
+
+    @classmethod
+    def decay_activity(cls, factor):
+        """Multiply the activity of every active location by ``factor`` in one UPDATE."""
+        activity = models.Case(
+            models.When(activity__lt=MIN_ACTIVITY / factor, then=models.Value(0.0)),
+            default=models.F("activity") * factor,
+            output_field=models.FloatField(),
+        )
+        return cls.objects.filter(activity__gt=0).update(
+            activity=activity,
+            popularity=popularity_expression(activity=activity),
+        )
 
 
 class Review(models.Model):
@@ -60,12 +200,32 @@ class Review(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(10)]
     )
     comment = models.TextField()
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["location", "-created_at", "-id"],
+                name="review_loc_created_id_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Review by {self.user} on {self.location.title}"
 
+    @classmethod
+    def adjust_vote_counters(cls, review_id, likes=0, dislikes=0):
+        """Atomically shift the denormalized like/dislike counters of a review."""
+        updates = {}
+        for field, delta in (("likes_count", likes), ("dislikes_count", dislikes)):
+            if delta:
+                updates[field] = Greatest(models.F(field) + delta, 0)
+        if updates:
+            cls.objects.filter(pk=review_id).update(**updates)
+
 
 class LikeDislike(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -94,3 +254,61 @@ class LocationSubscription(models.Model):
 
     class Meta:
         unique_together = ("user", "location")
+
+
+class ExportFormat(Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
+class ExportStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
+class ExportJob(models.Model):
+    format = models.CharField(max_length=10, choices=ExportFormat.choices())
+    filters = models.JSONField(default=dict)
+    filters_digest = models.CharField(max_length=32)
+    generation = models.BigIntegerField()
+    status = models.CharField(
+        max_length=10,
+        choices=ExportStatus.choices(),
+        default=ExportStatus.PENDING.value,
+    )
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("format", "filters_digest", "generation")
+
+    def __str__(self):
+        return f"{self.format} export #{self.pk} ({self.status})"
+
+
+class PendingReviewNotification(models.Model):
+    """A new review buffered for the next notification digest of a subscriber."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    review = models.ForeignKey(Review, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "review")
+
+    def __str__(self):
+        return f"Pending notification of {self.review} for {self.user}"
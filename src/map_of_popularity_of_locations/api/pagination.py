@@ -0,0 +1,185 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """Cursor pagination on ``(ordering field, id)``.
+
+    The cursor carries the ordering value and id of the boundary row, and a
+    page is fetched with ``WHERE field <= value AND (field < value OR (field =
+    value AND id < pk)) ORDER BY field, id LIMIT n`` (mirrored for ascending
+    order). The leading ``field <= value`` is implied by the rest; it is there
+    because the planner cannot derive an index bound from the OR alone, so with
+    it page 1000 costs the same index range scan as page 1. Filters stay in the
+    query string, so cursors combine with ``LocationFilter``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering_query_param = "ordering"
+    ordering_fields = ("created_at",)
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, fetching the page with async iteration."""
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """The still unevaluated query for the requested page plus one lookahead row."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset)
+        field = self.ordering.lstrip("-")
+        descending = self.ordering.startswith("-")
+
+        position, reverse = self.decode_cursor(request, queryset)
+        backwards = descending != reverse
+        if position is not None:
+            value, pk = position
+            lookup = "lt" if backwards else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}e": value}),
+                Q(**{f"{field}__{lookup}": value})
+                | Q(**{field: value, f"id__{lookup}": pk}),
+            )
+
+        prefix = "-" if backwards else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}id")
+        self.position, self.cursor_reversed = position, reverse
+        return queryset[: self.page_size + 1]
+
+    def get_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if self.cursor_reversed:
+            results.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.first_item = results[0] if results else None
+        self.last_item = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or settings.API_MAX_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            requested = page_size
+        return max(1, min(requested, settings.API_MAX_PAGE_SIZE))
+
+    def get_ordering(self, request, queryset):
+        ordering = request.query_params.get(self.ordering_query_param, "")
+        if ordering.lstrip("-") in self.ordering_fields:
+            return ordering
+        return self.default_ordering
+
+    def get_next_link(self):
+        if not self.has_next or self.last_item is None:
+            return None
+        return self.build_link(self.last_item, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_item is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.build_link(self.first_item, reverse=True)
+
+    def build_link(self, item, reverse):
+        field = self.ordering.lstrip("-")
+        value = self.get_item_value(item, field)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        payload = {
+            "o": self.ordering,
+            "p": [value, self.get_item_value(item, "id")],
+            "r": int(reverse),
+        }
+        encoded = urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            value, pk = payload["p"]
+            reverse = bool(payload["r"])
+            ordering = payload["o"]
+            if ordering != self.ordering or value is None or pk is None:
+                raise ValueError(ordering)
+            # A value the column cannot hold would otherwise fail in the filter.
+            value = self.get_ordering_field(queryset).to_python(value)
+            pk = queryset.model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), reverse
+
+    def get_ordering_field(self, queryset):
+        name = self.ordering.lstrip("-")
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def get_item_value(item, field):
+        if isinstance(item, dict):
+            return item[field]
+        return getattr(item, field)
+
+
+class LocationCursorPagination(KeysetCursorPagination):
+    ordering_fields = ("created_at", "average_rating", "popularity")
+    # Annotation added by a filter -> ordering used unless the client picks another.
+    annotation_orderings = (("distance", "distance"), ("search_rank", "-search_rank"))
+
+    def get_ordering(self, request, queryset):
+        requested = request.query_params.get(self.ordering_query_param, "")
+        if requested.lstrip("-") not in self.ordering_fields:
+            for annotation, ordering in self.annotation_orderings:
+                if annotation in queryset.query.annotations:
+                    return ordering
+        return super().get_ordering(request, queryset)
+
+
+class ReviewCursorPagination(KeysetCursorPagination):
+    ordering_fields = ("created_at",)
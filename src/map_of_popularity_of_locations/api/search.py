@@ -0,0 +1,76 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, Q
+
+# Language-neutral dictionary: titles and descriptions are not all in one language.
+SEARCH_CONFIG = "simple"
+
+# The GIN indexes use Postgres-only operator classes, so they are created here
+# after migrate instead of in Location.Meta, keeping SQLite databases usable.
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS location_search_vector_idx "
+    "ON api_location USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS location_title_trgm_idx "
+    "ON api_location USING gin (title gin_trgm_ops)",
+)
+
+
+def is_postgres(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def location_search_vector():
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("address", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def ensure_search_indexes(using="default"):
+    if not is_postgres(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in POSTGRES_SEARCH_DDL:
+            cursor.execute(statement)
+
+
+def _prefix_tsquery(query):
+    """Turn free text into a tsquery where every word also matches as a prefix."""
+    return " & ".join(f"{term}:*" for term in re.findall(r"\w+", query))
+
+
+def search_locations(queryset, query):
+    """Filter ``queryset`` by ``query`` and annotate it with ``search_rank``.
+
+    On Postgres this matches the GIN-indexed ``search_vector`` with prefix
+    terms, or the title by trigram word similarity to tolerate typos, and ranks
+    by ``SearchRank`` plus that similarity. Other databases fall back to
+    ``icontains``.
+    """
+    if not is_postgres(queryset.db):
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(description__icontains=query)
+            | Q(address__icontains=query)
+        )
+
+    terms = _prefix_tsquery(query)
+    if not terms:
+        return queryset.none()
+
+    search_query = SearchQuery(terms, search_type="raw", config=SEARCH_CONFIG)
+    return queryset.filter(
+        Q(search_vector=search_query) | Q(title__trigram_word_similar=query)
+    ).annotate(
+        search_rank=SearchRank(F("search_vector"), search_query)
+        + TrigramWordSimilarity(query, "title")
+    )
@@ -1,12 +1,12 @@
 from rest_framework import serializers
-from .models import Category, Location
+from rest_framework.reverse import reverse
+from .filters import LocationFilter
+from .models import Category, ExportJob, ExportStatus, Location
 from .models import Review
 
 class ReviewSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     email = serializers.EmailField(source="user.email", read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    dislikes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Review
@@ -23,12 +23,6 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Comment cannot be empty.")
         return value
 
-    def get_likes_count(self, obj):
-        return obj.likes_dislikes.filter(is_like=True).count()
-
-    def get_dislikes_count(self, obj):
-        return obj.likes_dislikes.filter(is_like=False).count()
-
 class LocationSerializer(serializers.ModelSerializer):
     reviews = ReviewSerializer(many=True, read_only=True)
     category = serializers.ChoiceField(choices=Category.choices(), default=Category.OTHER.name)
@@ -41,12 +35,15 @@ class LocationSerializer(serializers.ModelSerializer):
             'description',
             'address',
             'category',
+            'latitude',
+            'longitude',
             'created_at',
             'updated_at',
             'average_rating',
+            'popularity',
             'reviews',
         )
-        read_only_fields = ('id', 'created_at', 'updated_at', 'average_rating', 'reviews')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'average_rating', 'popularity', 'reviews')
 
     def validate_title(self, value):
         if not value.strip():
@@ -79,8 +76,54 @@ class LocationSerializer(serializers.ModelSerializer):
         return value
 
 
+class LocationListSerializer(serializers.ModelSerializer):
+    """Flat location rows for the list: what the map needs to place a pin.
 
+    ``fields`` narrows a row to any of LocationSerializer's fields, and
+    ``expand=("reviews",)`` nests the reviews as the detail does.
+    """
 
+    reviews = ReviewSerializer(many=True, read_only=True)
 
-    
-    
+    default_fields = ('id', 'title', 'category', 'latitude', 'longitude', 'average_rating', 'popularity')
+    expandable_fields = ('reviews',)
+
+    class Meta:
+        model = Location
+        fields = LocationSerializer.Meta.fields
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in set(self.fields) - self.get_selected_fields(fields, expand):
+            self.fields.pop(name)
+
+    @classmethod
+    def get_selected_fields(cls, fields=None, expand=()):
+        return set(fields or cls.default_fields) | set(expand)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    filters = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'format', 'filters', 'status', 'error', 'created_at', 'updated_at', 'download_url')
+        read_only_fields = ('id', 'status', 'error', 'created_at', 'updated_at', 'download_url')
+
+    def validate_filters(self, value):
+        allowed = ('search', 'category', 'min_rating', 'max_rating')
+        unknown = set(value) - set(allowed)
+        if unknown:
+            raise serializers.ValidationError(f"Unsupported filters: {', '.join(sorted(unknown))}.")
+        value = {key: item for key, item in value.items() if item != ""}
+        filterset = LocationFilter(data=value)
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        return value
+
+    def get_download_url(self, obj):
+        if obj.status != ExportStatus.DONE.value:
+            return None
+        return reverse('location-export-job-download', args=[obj.pk], request=self.context.get('request'))
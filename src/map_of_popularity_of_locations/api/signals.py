@@ -1,82 +1,223 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, post_migrate, post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
+from django.db import transaction
 
 from .helpers import (
-    get_export_csv_cache_key,
+    bump_cache_generation,
     get_likes_dislikes_cache_key,
     get_location_detail_cache_key,
+    get_subscribed_reviews_namespace,
     get_subscription_cache_key,
+    invalidate_location_exports,
+    invalidate_location_list_caches,
+    invalidate_location_review_caches,
 )
-from .models import LikeDislike, Location, Review, LocationSubscription
-from registration.utils import Util
+from .models import (
+    REVIEW_ACTIVITY_WEIGHT,
+    VOTE_ACTIVITY_WEIGHT,
+    LikeDislike,
+    Location,
+    LocationSubscription,
+    Review,
+    popularity_expression,
+)
+from .clusters import cluster_cache_keys_for_point
+from .leaderboards import sync_location_leaderboards
+from .search import ensure_search_indexes, is_postgres, location_search_vector
+from .tasks import notify_location_subscribers
 
 
 @receiver(post_save, sender=Review)
 def notify_subscribers(sender, instance, created, **kwargs):
     if created:
-        location = instance.location
-        subscriptions = LocationSubscription.objects.filter(location=location)
+        review_id = instance.id
+        transaction.on_commit(lambda: notify_location_subscribers.delay(review_id))
+
+
+@receiver(post_migrate)
+def create_search_indexes(sender, using="default", **kwargs):
+    if sender.label == "api":
+        ensure_search_indexes(using)
 
-        for subscription in subscriptions:
-            user = subscription.user
-            email_data = {
-                "email_subject": f"New review for {location.title}",
-                "email_body": f"A new review has been posted for {location.title}: {instance.comment}",
-                "to_email": user.email,
-            }
-            Util.send_email(email_data)
+
+@receiver(post_save, sender=Location)
+def update_location_search_vector(sender, instance, **kwargs):
+    if is_postgres(instance._state.db):
+        Location.objects.filter(pk=instance.pk).update(
+            search_vector=location_search_vector()
+        )
+
+
+@receiver(post_save, sender=Location)
+def initialize_location_popularity(sender, instance, created, **kwargs):
+    # A location without reviews starts at the prior, not below every rated one.
+    if created:
+        Location.objects.filter(pk=instance.pk).update(popularity=popularity_expression())
+
+
+def sync_leaderboards_on_commit(location_ids):
+    # Rescored from the committed rows, so concurrent writers cannot leave a stale score.
+    transaction.on_commit(lambda: sync_location_leaderboards(location_ids))
 
 
 @receiver([post_save, post_delete], sender=Location)
-def invalidate_location_caches(sender, instance, **kwargs):
-    location_id = instance.id
+def sync_location_leaderboard_entry(sender, instance, **kwargs):
+    # Covers creation, category changes and deletion.
+    sync_leaderboards_on_commit([instance.pk])
 
-    cache.delete(get_location_detail_cache_key(location_id))
 
-    (
-        cache.delete_pattern("locations:list:*")
-        if hasattr(cache, "delete_pattern")
-        else None
+@receiver(post_init, sender=Location)
+def remember_location_position(sender, instance, **kwargs):
+    # Read through __dict__ so deferred coordinates are not loaded one query per row.
+    instance._persisted_position = (
+        instance.__dict__.get("latitude"),
+        instance.__dict__.get("longitude"),
     )
 
-    cache.delete(get_export_csv_cache_key())
 
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_clusters(sender, instance, **kwargs):
+    current_position = (
+        instance.__dict__.get("latitude"),
+        instance.__dict__.get("longitude"),
+    )
+    keys = set(cluster_cache_keys_for_point(*instance._persisted_position))
+    keys.update(cluster_cache_keys_for_point(*current_position))
+    cache.delete_many(keys)
+    instance._persisted_position = current_position
 
-@receiver([post_save, post_delete], sender=Review)
-def invalidate_review_caches(sender, instance, **kwargs):
-    location = instance.location
-    location_id = location.id
 
-    location.update_average_rating()
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_caches(sender, instance, **kwargs):
+    cache.delete(get_location_detail_cache_key(instance.id))
+
+    invalidate_location_list_caches()
+
+    invalidate_location_exports()
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._persisted_rating = instance.rating
+    instance._persisted_location_id = instance.location_id
+
 
-    (
-        cache.delete_pattern(f"reviews:location:{location_id}*")
-        if hasattr(cache, "delete_pattern")
-        else None
+@receiver(post_save, sender=Review)
+def update_location_rating_on_save(sender, instance, created, **kwargs):
+    if created:
+        Location.apply_rating_change(
+            instance.location_id,
+            rating_delta=instance.rating,
+            count_delta=1,
+            activity_delta=REVIEW_ACTIVITY_WEIGHT,
+        )
+    elif instance._persisted_location_id != instance.location_id:
+        Location.apply_rating_change(
+            instance._persisted_location_id,
+            rating_delta=-instance._persisted_rating,
+            count_delta=-1,
+        )
+        Location.apply_rating_change(
+            instance.location_id, rating_delta=instance.rating, count_delta=1
+        )
+    elif instance._persisted_rating != instance.rating:
+        Location.apply_rating_change(
+            instance.location_id,
+            rating_delta=instance.rating - instance._persisted_rating,
+        )
+
+    sync_leaderboards_on_commit(
+        {instance._persisted_location_id, instance.location_id} - {None}
+    )
+    instance._persisted_rating = instance.rating
+    instance._persisted_location_id = instance.location_id
+
+
+@receiver(post_delete, sender=Review)
+def update_location_rating_on_delete(sender, instance, **kwargs):
+    Location.apply_rating_change(
+        instance._persisted_location_id,
+        rating_delta=-instance._persisted_rating,
+        count_delta=-1,
     )
+    sync_leaderboards_on_commit([instance._persisted_location_id])
 
-    cache.delete(get_location_detail_cache_key(location_id))
 
-    (
-        cache.delete_pattern("locations:list:*")
-        if hasattr(cache, "delete_pattern")
-        else None
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_caches(sender, instance, **kwargs):
+    invalidate_location_review_caches(instance.location_id)
+
+    # The cluster cells of the location aggregate its average_rating.
+    position = (
+        Location.objects.filter(pk=instance.location_id)
+        .values_list("latitude", "longitude")
+        .first()
     )
+    if position:
+        cache.delete_many(cluster_cache_keys_for_point(*position))
+
+    # Exports carry average_rating, which review writes change without a Location signal.
+    invalidate_location_exports()
 
 
 @receiver([post_save, post_delete], sender=LocationSubscription)
 def invalidate_subscription_caches(sender, instance, **kwargs):
-    user_id = instance.user.id
-    location_id = instance.location.id
+    user_id = instance.user_id
+    location_id = instance.location_id
 
     cache.delete(get_subscription_cache_key(user_id, location_id))
 
-    cache.delete(f"reviews:user:{user_id}:subscribed")
+    bump_cache_generation(get_subscribed_reviews_namespace(user_id))
+
+
+def _is_like(instance):
+    # The value as stored: a raw "False" string assigned to the field is truthy.
+    return instance._meta.get_field("is_like").to_python(instance.is_like)
+
+
+@receiver(post_init, sender=LikeDislike)
+def remember_like_dislike_state(sender, instance, **kwargs):
+    instance._persisted_is_like = _is_like(instance)
+
+
+def _review_location(review_id):
+    return Review.objects.filter(pk=review_id).values_list("location_id", flat=True)[:1]
+
+
+@receiver(post_save, sender=LikeDislike)
+def update_review_vote_counters_on_save(sender, instance, created, **kwargs):
+    previous = None if created else instance._persisted_is_like
+    is_like = _is_like(instance)
+    if previous != is_like:
+        likes = int(is_like) - int(previous is True)
+        dislikes = int(not is_like) - int(previous is False)
+        Review.adjust_vote_counters(instance.review_id, likes=likes, dislikes=dislikes)
+        Location.apply_vote_change(
+            _review_location(instance.review_id),
+            likes=likes,
+            dislikes=dislikes,
+            activity_delta=VOTE_ACTIVITY_WEIGHT if created else 0,
+        )
+        sync_leaderboards_on_commit(_review_location(instance.review_id))
+    instance._persisted_is_like = is_like
+
+
+@receiver(post_delete, sender=LikeDislike)
+def update_review_vote_counters_on_delete(sender, instance, **kwargs):
+    if instance._persisted_is_like is None:
+        return
+    likes = int(instance._persisted_is_like)
+    dislikes = 1 - likes
+    Review.adjust_vote_counters(instance.review_id, likes=-likes, dislikes=-dislikes)
+    Location.apply_vote_change(
+        _review_location(instance.review_id), likes=-likes, dislikes=-dislikes
+    )
+    sync_leaderboards_on_commit(_review_location(instance.review_id))
 
 
 @receiver([post_save, post_delete], sender=LikeDislike)
 def invalidate_likes_dislikes_caches(sender, instance, **kwargs):
-    review_id = instance.review.id
+    review_id = instance.review_id
 
     cache.delete(get_likes_dislikes_cache_key(review_id))
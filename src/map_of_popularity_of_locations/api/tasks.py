@@ -1,7 +1,31 @@
+import os
+from itertools import groupby
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.cache import cache, caches
+from django.core.mail import get_connection, send_mail, send_mass_mail
 from django.conf import settings
 
+from .exports import EXPORT_FILE_EXTENSIONS, build_export_queryset, write_locations_export
+from .helpers import get_location_detail_cache_key, invalidate_location_list_caches
+from .leaderboards import (
+    LEADERBOARD_CACHE_ALIAS,
+    LEADERBOARD_REBUILD_LOCK_KEY,
+    LEADERBOARD_SYNC_CHUNK_SIZE,
+    rebuild_leaderboards,
+    sync_location_leaderboards,
+)
+from .models import (
+    ExportJob,
+    ExportStatus,
+    Location,
+    LocationSubscription,
+    PendingReviewNotification,
+    Review,
+)
+
+SUBSCRIBER_NOTIFICATION_CHUNK_SIZE = 500
+
 @shared_task
 def send_subcribe_email(user_email, location_title):
     send_mail(
@@ -12,3 +36,182 @@ def send_subcribe_email(user_email, location_title):
             fail_silently=False,
         )
     return send_mail()
+
+
+@shared_task
+def generate_location_export(job_id):
+    job = ExportJob.objects.get(pk=job_id)
+    job.status = ExportStatus.RUNNING.value
+    job.save(update_fields=["status", "updated_at"])
+
+    os.makedirs(settings.EXPORT_STORAGE_DIR, exist_ok=True)
+    extension = EXPORT_FILE_EXTENSIONS[job.format]
+    path = os.path.join(
+        settings.EXPORT_STORAGE_DIR, f"locations-{job.filters_digest}-{job.pk}.{extension}"
+    )
+
+    try:
+        write_locations_export(build_export_queryset(job.filters), job.format, path)
+    except Exception as exc:
+        job.status = ExportStatus.FAILED.value
+        job.error = str(exc)
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    job.status = ExportStatus.DONE.value
+    job.file_path = path
+    job.error = ""
+    job.save(update_fields=["status", "file_path", "error", "updated_at"])
+
+    superseded = ExportJob.objects.filter(
+        format=job.format,
+        filters_digest=job.filters_digest,
+        generation__lt=job.generation,
+        status=ExportStatus.DONE.value,
+    )
+    for old_job in superseded:
+        if old_job.file_path and os.path.exists(old_job.file_path):
+            os.remove(old_job.file_path)
+    superseded.update(status=ExportStatus.EXPIRED.value, file_path="")
+
+    return path
+
+
+@shared_task
+def notify_location_subscribers(review_id):
+    """Fan a new review out to the location's subscribers in chunks of recipients."""
+    review = (
+        Review.objects.filter(pk=review_id)
+        .values("comment", "location_id", "location__title")
+        .first()
+    )
+    if review is None:
+        return 0
+
+    title = review["location__title"]
+    subject = f"New review for {title}"
+    body = f"A new review has been posted for {title}: {review['comment']}"
+    # Subscribing to the location is the opt-in; review_digest picks the
+    # periodic digest over one email per review.
+    subscribers = LocationSubscription.objects.filter(location_id=review["location_id"])
+
+    digest_user_ids = subscribers.filter(user__review_digest=True).values_list(
+        "user_id", flat=True
+    )
+    PendingReviewNotification.objects.bulk_create(
+        (
+            PendingReviewNotification(user_id=user_id, review_id=review_id)
+            for user_id in digest_user_ids.iterator(
+                chunk_size=SUBSCRIBER_NOTIFICATION_CHUNK_SIZE
+            )
+        ),
+        batch_size=SUBSCRIBER_NOTIFICATION_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+    emails = (
+        subscribers.filter(user__review_digest=False)
+        .order_by("pk")
+        .values_list("user__email", flat=True)
+        .iterator(chunk_size=SUBSCRIBER_NOTIFICATION_CHUNK_SIZE)
+    )
+
+    chunks = 0
+    chunk = []
+    for email in emails:
+        chunk.append(email)
+        if len(chunk) >= SUBSCRIBER_NOTIFICATION_CHUNK_SIZE:
+            send_review_notifications.delay(subject, body, chunk)
+            chunks += 1
+            chunk = []
+    if chunk:
+        send_review_notifications.delay(subject, body, chunk)
+        chunks += 1
+    return chunks
+
+
+@shared_task
+def send_review_notifications(subject, body, recipients):
+    """Send one message per recipient over a single SMTP connection."""
+    messages = [(subject, body, None, [recipient]) for recipient in recipients]
+    with get_connection() as connection:
+        return send_mass_mail(messages, connection=connection)
+
+
+@shared_task
+def send_notification_digests():
+    """Flush the buffered review notifications as one email per user."""
+    last_id = PendingReviewNotification.objects.order_by("-pk").values_list(
+        "pk", flat=True
+    ).first()
+    if last_id is None:
+        return 0
+
+    rows = (
+        PendingReviewNotification.objects.filter(pk__lte=last_id)
+        .order_by("user_id", "pk")
+        .values_list(
+            "pk",
+            "user_id",
+            "user__email",
+            "review__location__title",
+            "review__rating",
+            "review__comment",
+        )
+        .iterator(chunk_size=SUBSCRIBER_NOTIFICATION_CHUNK_SIZE)
+    )
+
+    sent = 0
+    messages = []
+    message_ids = []
+    # Only the rows that went out are deleted; one committed late with a lower
+    # pk than last_id waits for the next run instead of being dropped.
+    sent_ids = []
+    try:
+        with get_connection() as connection:
+            for (_, email), user_rows in groupby(rows, key=lambda row: row[1:3]):
+                lines = []
+                for pk, _, _, title, rating, comment in user_rows:
+                    lines.append(f"- {title} ({rating}/10): {comment}")
+                    message_ids.append(pk)
+                body = "New reviews on the locations you follow:\n\n" + "\n".join(lines)
+                messages.append(("New reviews digest", body, None, [email]))
+                if len(messages) >= SUBSCRIBER_NOTIFICATION_CHUNK_SIZE:
+                    sent += send_mass_mail(messages, connection=connection)
+                    sent_ids.extend(message_ids)
+                    messages, message_ids = [], []
+            if messages:
+                sent += send_mass_mail(messages, connection=connection)
+                sent_ids.extend(message_ids)
+    finally:
+        for start in range(0, len(sent_ids), SUBSCRIBER_NOTIFICATION_CHUNK_SIZE):
+            PendingReviewNotification.objects.filter(
+                pk__in=sent_ids[start : start + SUBSCRIBER_NOTIFICATION_CHUNK_SIZE]
+            ).delete()
+    return sent
+
+
+@shared_task
+def decay_location_popularity():
+    """Decay the trending activity by one beat interval and re-derive popularity."""
+    half_life = settings.POPULARITY_HALF_LIFE_HOURS * 3600
+    factor = 0.5 ** (settings.POPULARITY_DECAY_INTERVAL / half_life)
+    active_ids = list(Location.objects.filter(activity__gt=0).values_list("pk", flat=True))
+    updated = Location.decay_activity(factor)
+    if updated:
+        invalidate_location_list_caches()
+    for start in range(0, len(active_ids), LEADERBOARD_SYNC_CHUNK_SIZE):
+        chunk = active_ids[start : start + LEADERBOARD_SYNC_CHUNK_SIZE]
+        sync_location_leaderboards(chunk)
+        # Detail bodies carry popularity, and their ETags are derived from it.
+        cache.delete_many([get_location_detail_cache_key(location_id) for location_id in chunk])
+    return updated
+
+
+@shared_task
+def rebuild_location_leaderboards():
+    """Rebuild the leaderboards after they were flushed or evicted."""
+    try:
+        return rebuild_leaderboards()
+    finally:
+        caches[LEADERBOARD_CACHE_ALIAS].delete(LEADERBOARD_REBUILD_LOCK_KEY)
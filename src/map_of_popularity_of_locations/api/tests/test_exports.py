@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pyarrow.parquet as pq
+from django.test import TestCase
+
+from api.exports import LOCATION_EXPORT_COLUMNS, write_locations_export
+from api.models import ExportFormat, Location
+
+
+class ParquetExportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "locations.parquet")
+
+    def test_rows_are_written_in_row_groups_of_chunk_size(self):
+        titles = [f"Location {index}" for index in range(5)]
+        for title in titles:
+            Location.objects.create(title=title, description="-", address="-", category="PARK")
+
+        write_locations_export(Location.objects.all(), ExportFormat.PARQUET.value, self.path, chunk_size=2)
+
+        parquet = pq.ParquetFile(self.path)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.column_names, [field for _, field in LOCATION_EXPORT_COLUMNS])
+        self.assertEqual(sorted(table.column("title").to_pylist()), titles)
+        self.assertEqual(str(table.schema.field("created_at").type), "timestamp[us, tz=UTC]")
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+
+    def test_empty_export_keeps_the_columns(self):
+        write_locations_export(Location.objects.none(), ExportFormat.PARQUET.value, self.path)
+
+        table = pq.read_table(self.path)
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.column_names, [field for _, field in LOCATION_EXPORT_COLUMNS])
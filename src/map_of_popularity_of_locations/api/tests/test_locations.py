@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import LikeDislike, Location, Review
+
+User = get_user_model()
+
+
+class LocationAggregateTests(APITestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="x")
+        self.client.force_authenticate(self.user)
+        self.location = Location.objects.create(
+            title="Park", description="A park.", address="Main st. 1", category="PARK"
+        )
+        self.url = reverse("location-detail", args=[self.location.pk])
+
+    def test_reviews_and_votes_keep_updated_at_but_change_the_etag(self):
+        updated_at = self.location.updated_at
+        etag = self.client.get(self.url)["ETag"]
+
+        review = Review.objects.create(user=self.user, location=self.location, rating=9, comment="-")
+        self.location.refresh_from_db()
+        self.assertEqual((self.location.rating_count, self.location.updated_at), (1, updated_at))
+        review_etag = self.client.get(self.url)["ETag"]
+        self.assertNotEqual(review_etag, etag)
+
+        LikeDislike.objects.create(user=self.user, review=review, is_like=True)
+        self.location.refresh_from_db()
+        self.assertEqual((self.location.likes_count, self.location.updated_at), (1, updated_at))
+        self.assertNotEqual(self.client.get(self.url)["ETag"], review_etag)
+
+    def test_editing_the_location_moves_updated_at(self):
+        updated_at = self.location.updated_at
+        response = self.client.patch(self.url, {"title": "City park"})
+        self.assertEqual(response.status_code, 200)
+        self.location.refresh_from_db()
+        self.assertGreater(self.location.updated_at, updated_at)
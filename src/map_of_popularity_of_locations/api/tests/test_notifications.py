@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase
+
+from api.models import Location, LocationSubscription, PendingReviewNotification, Review
+from api.tasks import notify_location_subscribers, send_notification_digests
+
+User = get_user_model()
+
+
+class ReviewNotificationTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(
+            title="Park", description="A park.", address="Main st. 1", category="PARK"
+        )
+        # is_subscribed keeps its default: the location subscription alone opts in.
+        self.instant = User.objects.create_user(username="instant", email="instant@example.com")
+        self.digest = User.objects.create_user(
+            username="digest", email="digest@example.com", review_digest=True
+        )
+        for user in (self.instant, self.digest):
+            LocationSubscription.objects.create(user=user, location=self.location)
+        author = User.objects.create_user(username="author", email="author@example.com")
+        self.review = Review.objects.create(user=author, location=self.location, rating=8, comment="Nice.")
+
+    def test_every_subscriber_is_notified(self):
+        mail.outbox = []
+        notify_location_subscribers(self.review.pk)
+
+        self.assertEqual([message.to for message in mail.outbox], [["instant@example.com"]])
+        self.assertEqual(
+            list(PendingReviewNotification.objects.values_list("user_id", "review_id")),
+            [(self.digest.pk, self.review.pk)],
+        )
+
+        mail.outbox = []
+        self.assertEqual(send_notification_digests(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [["digest@example.com"]])
+        self.assertFalse(PendingReviewNotification.objects.exists())
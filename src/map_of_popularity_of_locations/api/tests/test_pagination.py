@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Location
+
+User = get_user_model()
+
+
+class KeysetCursorPaginationTests(APITestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.client.force_authenticate(
+            User.objects.create_user(username="reader", email="reader@example.com", password="x")
+        )
+        # Ties on the ordering value are broken by id across page boundaries.
+        self.ids = []
+        for index, rating in enumerate((5.0, 5.0, 5.0, 7.0, 7.0, 3.0, 5.0)):
+            location = Location.objects.create(
+                title=f"Location {index}", description="-", address="-", category="PARK"
+            )
+            Location.objects.filter(pk=location.pk).update(average_rating=rating)
+            self.ids.append(location.pk)
+
+    def walk(self, url, link):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            ids.extend(item["id"] for item in page["results"])
+            url = page[link]
+            pages += 1
+        return ids, pages
+
+    def test_walks_every_row_once_in_both_directions(self):
+        for ordering in ("-average_rating", "average_rating"):
+            with self.subTest(ordering=ordering):
+                url = reverse("location-list") + f"?ordering={ordering}&page_size=2"
+                forward, pages = self.walk(url, "next")
+                self.assertEqual(sorted(forward), sorted(self.ids))
+                self.assertEqual(len(forward), len(set(forward)))
+                self.assertEqual(pages, 4)
+
+                last_page = self.client.get(url).json()
+                while last_page["next"]:
+                    last_page = self.client.get(last_page["next"]).json()
+                backward, _ = self.walk(last_page["previous"], "previous")
+                expected = forward[: -len(last_page["results"])]
+                self.assertEqual(sorted(backward, key=forward.index), expected)
+
+    def test_cursor_filter_bounds_the_ordering_column(self):
+        url = reverse("location-list") + "?ordering=-average_rating&page_size=2"
+        next_url = self.client.get(url).json()["next"]
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(next_url)
+        page_query = next(q["sql"] for q in queries if "ORDER BY" in q["sql"])
+        self.assertIn('"api_location"."average_rating" <= ', page_query)
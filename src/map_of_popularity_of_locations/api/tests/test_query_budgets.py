@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.leaderboards import rebuild_leaderboards
+from api.models import LikeDislike, Location, LocationSubscription, Review
+from locations.testing import QueryBudgetExceeded, assert_max_queries, assert_within_query_budget
+from registration.tokens import ACCESS_TOKEN, issue_tokens
+
+User = get_user_model()
+
+
+class QueryBudgetTests(APITestCase):
+    """Each hot path stays within its QUERY_BUDGETS entry with a cold cache."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="x")
+        # Token auth, as real clients use: its user lookup counts against the budgets.
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.user)[ACCESS_TOKEN]}")
+        self.locations = [
+            Location.objects.create(
+                title=f"Location {index}", description="-", address="-", category="PARK"
+            )
+            for index in range(3)
+        ]
+        self.location = self.locations[0]
+        self.reviews = []
+        for index in range(3):
+            author = User.objects.create_user(username=f"author{index}", email=f"author{index}@example.com")
+            for location in self.locations:
+                self.reviews.append(
+                    Review.objects.create(user=author, location=location, rating=5 + index, comment="-")
+                )
+                LocationSubscription.objects.create(user=author, location=location)
+        self.review = self.reviews[0]
+        for voter in User.objects.filter(username__startswith="author"):
+            LikeDislike.objects.create(user=voter, review=self.review, is_like=True)
+        LocationSubscription.objects.create(user=self.user, location=self.location)
+        for cache in caches.all():
+            cache.clear()
+        # The leaderboards are a store rather than a cache; "top" reads them when built.
+        rebuild_leaderboards()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_location_reads(self):
+        for url in (
+            reverse("location-list"),
+            reverse("location-list") + "?expand=reviews",
+            reverse("location-detail", args=[self.location.pk]),
+            reverse("location-top"),
+            reverse("location-clusters") + "?bbox=-90,-180,90,180&zoom=3",
+        ):
+            with self.subTest(url=url):
+                assert_within_query_budget(self.get(url))
+
+    def test_review_reads(self):
+        for url in (
+            reverse("location-reviews-list", args=[self.location.pk]),
+            reverse("location-reviews-detail", args=[self.location.pk, self.review.pk]),
+            reverse("subscribed-reviews"),
+            reverse("like_dislike", args=[self.review.pk]),
+        ):
+            with self.subTest(url=url):
+                assert_within_query_budget(self.get(url))
+
+    def test_writes(self):
+        response = self.client.post(reverse("like_dislike", args=[self.review.pk]), {"is_like": "false"})
+        self.assertEqual(response.status_code, 201)
+        assert_within_query_budget(response)
+
+        response = self.client.post(
+            reverse("location-reviews-list", args=[self.locations[1].pk]), {"rating": 7, "comment": "Fine."}
+        )
+        self.assertEqual(response.status_code, 201)
+        assert_within_query_budget(response)
+
+        response = self.client.post(reverse("location-subscribe", args=[self.locations[2].pk]))
+        self.assertEqual(response.status_code, 201)
+        assert_within_query_budget(response)
+
+    def test_async_reads(self):
+        for url in (
+            reverse("async-location-list"),
+            reverse("async-location-detail", args=[self.location.pk]),
+            reverse("async-location-reviews-list", args=[self.location.pk]),
+            reverse("async-like-dislike", args=[self.review.pk]),
+        ):
+            with self.subTest(url=url):
+                assert_within_query_budget(self.get(url))
+
+    def test_cached_reads_skip_the_database(self):
+        url = reverse("like_dislike", args=[self.review.pk])
+        self.get(url)
+        with assert_max_queries(0):
+            self.get(url)
+
+    def test_budget_overrun_fails(self):
+        response = self.get(reverse("location-list"))
+        with self.assertRaises(QueryBudgetExceeded):
+            assert_within_query_budget(response, budget=0)
+        with self.assertRaises(QueryBudgetExceeded), assert_max_queries(0):
+            Location.objects.count()
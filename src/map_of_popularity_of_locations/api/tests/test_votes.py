@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import LikeDislike, Location, Review
+
+User = get_user_model()
+
+
+class LikeDislikeTests(APITestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        author = User.objects.create_user(username="author", email="author@example.com", password="x")
+        self.voter = User.objects.create_user(username="voter", email="voter@example.com", password="x")
+        self.location = Location.objects.create(
+            title="Park", description="A park.", address="Main st. 1", category="PARK"
+        )
+        self.review = Review.objects.create(user=author, location=self.location, rating=8, comment="Nice.")
+        self.url = reverse("like_dislike", args=[self.review.pk])
+        self.client.force_authenticate(self.voter)
+
+    def assertCounters(self, likes, dislikes):
+        self.review.refresh_from_db()
+        self.location.refresh_from_db()
+        self.assertEqual((self.review.likes_count, self.review.dislikes_count), (likes, dislikes))
+        self.assertEqual((self.location.likes_count, self.location.dislikes_count), (likes, dislikes))
+
+    def test_form_encoded_dislike_is_stored_as_false(self):
+        response = self.client.post(self.url, {"is_like": "False"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(self.url, {"is_like": "False"})
+        self.assertEqual(response.data["detail"], "No change made.")
+
+        self.assertFalse(LikeDislike.objects.get(user=self.voter, review=self.review).is_like)
+        self.assertCounters(likes=0, dislikes=1)
+
+    def test_switching_vote_moves_the_counters(self):
+        self.client.post(self.url, {"is_like": "true"})
+        self.assertCounters(likes=1, dislikes=0)
+
+        response = self.client.post(self.url, {"is_like": "0"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounters(likes=0, dislikes=1)
+
+        response = self.client.post(self.url, {"is_like": True}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounters(likes=1, dislikes=0)
+
+        self.client.delete(self.url)
+        self.assertCounters(likes=0, dislikes=0)
+
+    def test_invalid_is_like_is_rejected(self):
+        for data in ({}, {"is_like": "maybe"}):
+            response = self.client.post(self.url, data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(LikeDislike.objects.exists())
+        self.assertCounters(likes=0, dislikes=0)
+
+    def test_get_returns_fresh_counts_after_a_vote(self):
+        self.assertEqual(self.client.get(self.url).data, {"likes_count": 0, "dislikes_count": 0})
+        self.client.post(self.url, {"is_like": "False"})
+        self.assertEqual(self.client.get(self.url).data, {"likes_count": 0, "dislikes_count": 1})
+
+    def test_raw_string_assignment_counts_as_its_bool(self):
+        vote = LikeDislike.objects.create(user=self.voter, review=self.review, is_like="False")
+        self.assertCounters(likes=0, dislikes=1)
+        vote.is_like = "False"
+        vote.save()
+        self.assertCounters(likes=0, dislikes=1)
@@ -1,8 +1,17 @@
 from rest_framework_nested import routers
 from django.urls import path
-from .views import LikeDislikeView, LocationViewSet, ReviewViewSet
+from .async_views import (
+    AsyncLikeDislikeView,
+    AsyncLocationDetailView,
+    AsyncLocationListView,
+    AsyncReviewListView,
+)
+from .views import ExportJobViewSet, LikeDislikeView, LocationViewSet, ReviewViewSet
 
 router = routers.SimpleRouter()
+router.register(
+    r"locations/export/jobs", ExportJobViewSet, basename="location-export-job"
+)
 router.register(r"locations", LocationViewSet, basename="location")
 
 
@@ -10,6 +19,28 @@ locations_router = routers.NestedSimpleRouter(router, r"locations", lookup="loca
 locations_router.register(r"reviews", ReviewViewSet, basename="location-reviews")
 
 urlpatterns = [
+    # Async read endpoints, same responses as their DRF counterparts.
+    path("async/locations/", AsyncLocationListView.as_view(), name="async-location-list"),
+    path(
+        "async/locations/<int:pk>/",
+        AsyncLocationDetailView.as_view(),
+        name="async-location-detail",
+    ),
+    path(
+        "async/locations/<int:location_pk>/reviews/",
+        AsyncReviewListView.as_view(),
+        name="async-location-reviews-list",
+    ),
+    path(
+        "async/reviews/<int:review_pk>/like_dislike/",
+        AsyncLikeDislikeView.as_view(),
+        name="async-like-dislike",
+    ),
+    path(
+        "reviews/subscribed/",
+        ReviewViewSet.as_view({"get": "list"}),
+        name="subscribed-reviews",
+    ),
     path(
         "reviews/<int:review_pk>/like_dislike/",
         LikeDislikeView.as_view(),
@@ -1,80 +1,227 @@
-from rest_framework.viewsets import ModelViewSet
+import hashlib
+import os
+
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from rest_framework.mixins import RetrieveModelMixin
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
-from api.models import Location
+from api.models import Category, Location
 from .helpers import (
-    get_export_csv_cache_key,
+    LOCATION_EXPORT_NAMESPACE,
+    get_cache_generation,
+    get_export_filters_digest,
     get_likes_dislikes_cache_key,
     get_location_detail_cache_key,
     get_location_list_cache_key,
+    get_location_reviews_namespace,
+    get_query_params_digest,
+    get_review_detail_cache_key,
     get_reviews_cache_key,
+    get_subscribed_locations_cache_key,
+    get_subscribed_reviews_cache_key,
     get_subscription_cache_key,
+    invalidate_location_review_caches,
+)
+from .clusters import (
+    MAX_CLUSTER_CELLS,
+    MAX_CLUSTER_ZOOM,
+    WORLD_BBOX,
+    count_cells_in_bbox,
+    get_cluster_aggregates,
+    serialize_clusters,
 )
-from .tasks import send_subcribe_email
-from .filters import LocationFilter
-from .serializers import LocationSerializer
+from .leaderboards import LEADERBOARD_METRICS, get_top_location_ids
+from .mixins import CachedResponseMixin, ReplicaReadMixin
+from .pagination import LocationCursorPagination, ReviewCursorPagination
+from .tasks import generate_location_export, send_subcribe_email
+from .exports import (
+    iter_locations_csv,
+    iter_locations_json_array,
+    iter_locations_ndjson,
+)
+from .filters import LocationFilter, LocationSearchFilter
+from .serializers import LocationListSerializer, LocationSerializer
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import FileResponse, StreamingHttpResponse
 import pandas as pd
-from rest_framework import status
-from .models import LikeDislike, LocationSubscription, Review
-from .serializers import ReviewSerializer
+from rest_framework import serializers, status
+from .models import ExportJob, ExportStatus, LikeDislike, LocationSubscription, Review
+from .serializers import ExportJobSerializer, ReviewSerializer
 from rest_framework.views import APIView
-import csv
-import io
 from django.core.mail import send_mail
 from django.core.cache import cache
 
 
-class LocationViewSet(ModelViewSet):
+class LocationViewSet(ReplicaReadMixin, CachedResponseMixin, ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, LocationSearchFilter]
     filterset_class = LocationFilter
-    search_fields = ["title", "description"]
+    pagination_class = LocationCursorPagination
+    export_chunk_size = 2000
+    export_json_chunk_size = 500
+    nested_reviews_actions = ("retrieve", "export_json")
+    _list_fields = None
 
     def get_queryset(self):
-        search_param = self.request.GET.get("search", "")
         category_param = self.request.GET.get("category", "")
-        cache_key = get_location_list_cache_key(search_param, category_param)
-
-        cached_locations = cache.get(cache_key)
-        if cached_locations:
-            return cached_locations
 
-        queryset = Location.objects.all()
+        if self.action == "list":
+            selected = LocationListSerializer.get_selected_fields(*self.get_list_fields())
+            nest_reviews = "reviews" in selected
+            # The ordering fields are loaded too: the cursor is built from them.
+            queryset = Location.objects.only(
+                "id", *LocationCursorPagination.ordering_fields, *(selected - {"reviews"})
+            )
+        else:
+            nest_reviews = self.action in self.nested_reviews_actions
+            queryset = Location.objects.defer("search_vector")
 
-        if search_param:
-            queryset = queryset.filter(title__icontains=search_param)
         if category_param:
             queryset = queryset.filter(category=category_param)
 
-        cache.set(cache_key, queryset, timeout=300)
+        if nest_reviews:
+            # LocationSerializer nests every review with its author's email.
+            queryset = queryset.prefetch_related(
+                Prefetch("reviews", queryset=Review.objects.select_related("user"))
+            )
+
         return queryset
 
-    def perform_create(self, serializer):
-        location = serializer.save()
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
+    def get_serializer_class(self):
+        if self.action == "list":
+            return LocationListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == "list":
+            kwargs["fields"], kwargs["expand"] = self.get_list_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_fields(self):
+        """The ``?fields=`` and ``?expand=`` of a list request, as two lists of names."""
+        if self._list_fields is None:
+            params = self.request.query_params
+            fields = [name for name in params.get("fields", "").split(",") if name]
+            expand = [name for name in params.get("expand", "").split(",") if name]
+            unknown_fields = set(fields) - set(LocationListSerializer.Meta.fields)
+            if unknown_fields:
+                raise ValidationError(
+                    {"fields": f"Unknown field(s): {', '.join(sorted(unknown_fields))}."}
+                )
+            unknown_expand = set(expand) - set(LocationListSerializer.expandable_fields)
+            if unknown_expand:
+                raise ValidationError(
+                    {"expand": f"Only {', '.join(LocationListSerializer.expandable_fields)} can be expanded."}
+                )
+            self._list_fields = (fields, expand)
+        return self._list_fields
+
+    def get_response_cache_key(self):
+        if self.action == "retrieve":
+            return get_location_detail_cache_key(self.kwargs["pk"])
+        return get_location_list_cache_key(
+            get_query_params_digest(self.request.query_params)
         )
-        return location
 
-    def perform_update(self, serializer):
-        location = serializer.save()
-        cache_key = get_location_detail_cache_key(location.id)
-        cache.delete(cache_key)
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
+    def get_response_etag(self, cache_key):
+        if self.action != "retrieve":
+            return super().get_response_etag(cache_key)
+        # The detail key has no generation. Edits of the location move
+        # updated_at, the hourly decay moves popularity, and review and vote
+        # writes (F() updates that leave updated_at alone) bump the generation
+        # of its reviews.
+        location_id = self.kwargs["pk"]
+        try:
+            row = (
+                Location.objects.filter(pk=location_id)
+                .values_list("updated_at", "popularity")
+                .first()
+            )
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        updated_at, popularity = row
+        generation = get_cache_generation(get_location_reviews_namespace(location_id))
+        return hashlib.md5(
+            f"{location_id}:{updated_at.isoformat()}:{popularity!r}:{generation}".encode()
+        ).hexdigest()
+
+    @action(detail=False, methods=["get"], url_path="clusters")
+    def clusters(self, request):
+        try:
+            zoom = int(request.query_params.get("zoom", 0))
+            bbox = request.query_params.get("bbox")
+            bbox = tuple(float(item) for item in bbox.split(",")) if bbox else WORLD_BBOX
+        except ValueError:
+            return Response(
+                {"detail": "zoom must be an integer and bbox four numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        zoom = max(0, min(zoom, MAX_CLUSTER_ZOOM))
+
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return Response(
+                {"detail": "bbox must be min_lng,min_lat,max_lng,max_lat."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if count_cells_in_bbox(zoom, bbox) > MAX_CLUSTER_CELLS:
+            return Response(
+                {"detail": "Too many clusters for this viewport; lower the zoom."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Cached cells hold every location; filtered views are aggregated on the fly.
+        filtered = any(
+            request.query_params.get(param)
+            for param in ("search", "category", "min_rating", "max_rating")
+        )
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            if filtered
+            else Location.objects.all()
         )
-        cache.delete(get_export_csv_cache_key())
-        return location
+        aggregates = get_cluster_aggregates(queryset, zoom, bbox, use_cache=not filtered)
+
+        return Response({"zoom": zoom, "clusters": serialize_clusters(zoom, aggregates)})
+
+    @action(detail=False, methods=["get"], url_path="top")
+    def top(self, request):
+        category = request.query_params.get("category") or None
+        metric = request.query_params.get("by", "rating")
+        try:
+            limit = int(request.query_params.get("n", 10))
+        except ValueError:
+            return Response(
+                {"detail": "n must be an integer."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+        if category is not None and category not in Category.__members__:
+            return Response(
+                {"detail": f"Category must be one of: {', '.join(Category.__members__)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if metric not in LEADERBOARD_METRICS:
+            return Response(
+                {"detail": f"by must be one of: {', '.join(LEADERBOARD_METRICS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The ranking comes from the sorted set; the table is only hit by primary key.
+        location_ids = get_top_location_ids(metric, category, limit)
+        locations = Location.objects.defer("search_vector").prefetch_related(
+            Prefetch("reviews", queryset=Review.objects.select_related("user"))
+        ).in_bulk(location_ids)
+        ranked = [locations[pk] for pk in location_ids if pk in locations]
+        return Response(self.get_serializer(ranked, many=True).data)
 
     @action(detail=True, methods=["post"], url_path="subscribe")
     def subscribe(self, request, pk=None):
@@ -130,169 +277,158 @@ class LocationViewSet(ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="export/json")
     def export_json(self, request):
-        locations = self.get_queryset()
+        locations = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(locations, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="export/ndjson")
+    def export_ndjson(self, request):
+        locations = self.filter_queryset(self.get_queryset())
+        chunk_size = self.export_json_chunk_size
+
+        if request.query_params.get("array") in ("1", "true", "True"):
+            content = iter_locations_json_array(locations, chunk_size=chunk_size)
+            content_type = "application/json"
+        else:
+            content = iter_locations_ndjson(locations, chunk_size=chunk_size)
+            content_type = "application/x-ndjson"
+
+        return StreamingHttpResponse(content, content_type=content_type)
+
     @action(detail=False, methods=["get"], url_path="export/csv")
     def export_csv(self, request):
-        cache_key = get_export_csv_cache_key()
-        cached_export = cache.get(cache_key)
-
-        if cached_export:
-            return cached_export
-
-        locations = self.get_queryset()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            [
-                "Title",
-                "Description",
-                "Address",
-                "Category",
-                "Average Rating",
-                "Created At",
-                "Updated At",
-            ]
-        )
+        locations = self.filter_queryset(self.get_queryset())
 
-        for location in locations:
-            writer.writerow(
-                [
-                    location.title,
-                    location.description,
-                    location.address,
-                    location.category,
-                    location.average_rating,
-                    location.created_at,
-                    location.updated_at,
-                ]
-            )
-
-        response = Response(output.getvalue(), content_type="text/csv")
+        response = StreamingHttpResponse(
+            iter_locations_csv(locations, chunk_size=self.export_chunk_size),
+            content_type="text/csv",
+        )
         response["Content-Disposition"] = "attachment; filename=locations.csv"
-        cache.set(cache_key, response, timeout=600)
         return response
 
-    def perform_destroy(self, instance):
-        location_id = instance.id
-        cache_key = get_location_detail_cache_key(location_id)
-        cache.delete(cache_key)
-        (
-            cache.delete_pattern(f"reviews:location:{location_id}*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
-        cache.delete(get_export_csv_cache_key())
-        instance.delete()
 
-
-class ReviewViewSet(ModelViewSet):
-    serializer_class = ReviewSerializer
+class ExportJobViewSet(RetrieveModelMixin, GenericViewSet):
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        location_id = self.kwargs.get("location_pk")
-        user = self.request.user
-
-        if location_id:
-            cache_key = get_reviews_cache_key(location_id, user.id)
-            cached_reviews = cache.get(cache_key)
-
-            if cached_reviews:
-                return cached_reviews
-
-            queryset = Review.objects.filter(location_id=location_id)
-        else:
-            cache_key = f"reviews:user:{user.id}:subscribed"
-            cached_reviews = cache.get(cache_key)
-
-            if cached_reviews:
-                return cached_reviews
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        filters = serializer.validated_data.get("filters", {})
 
-            subscribed_locations = LocationSubscription.objects.filter(user=user)
-            location_ids = [
-                subscription.location.id for subscription in subscribed_locations
-            ]
-            queryset = Review.objects.filter(location_id__in=location_ids)
-
-        cache.set(cache_key, queryset, timeout=60 * 15)
-        return queryset
-
-    def perform_create(self, serializer):
-        location_id = self.kwargs["location_pk"]
-        review = serializer.save(user=self.request.user, location_id=location_id)
+        job, created = ExportJob.objects.get_or_create(
+            format=serializer.validated_data["format"],
+            filters_digest=get_export_filters_digest(filters),
+            generation=get_cache_generation(LOCATION_EXPORT_NAMESPACE),
+            defaults={"filters": filters},
+        )
 
-        review.location.update_average_rating()
+        if created or job.status == ExportStatus.FAILED.value:
+            job.status = ExportStatus.PENDING.value
+            job.error = ""
+            job.save(update_fields=["status", "error", "updated_at"])
+            transaction.on_commit(lambda: generate_location_export.delay(job.pk))
 
-        (
-            cache.delete_pattern(f"reviews:location:{location_id}*")
-            if hasattr(cache, "delete_pattern")
-            else None
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
 
-        cache.delete(get_location_detail_cache_key(location_id))
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+
+        if (
+            job.status == ExportStatus.DONE.value
+            and job.generation < get_cache_generation(LOCATION_EXPORT_NAMESPACE)
+        ):
+            # The locations changed after this file was written.
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            job.status = ExportStatus.EXPIRED.value
+            job.file_path = ""
+            job.save(update_fields=["status", "file_path", "updated_at"])
+        if job.status == ExportStatus.EXPIRED.value:
+            return Response(
+                {"detail": "Export is out of date; request a new one."},
+                status=status.HTTP_410_GONE,
+            )
+        if job.status != ExportStatus.DONE.value:
+            return Response(
+                {"detail": f"Export is not ready (status: {job.status})."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if not os.path.exists(job.file_path):
+            return Response(
+                {"detail": "Export file is no longer available."},
+                status=status.HTTP_410_GONE,
+            )
 
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
+        return FileResponse(
+            open(job.file_path, "rb"),
+            as_attachment=True,
+            filename=os.path.basename(job.file_path),
         )
 
-    def perform_update(self, serializer):
-        review = serializer.save()
-        location = review.location
 
-        location.update_average_rating()
+class ReviewViewSet(ReplicaReadMixin, CachedResponseMixin, ModelViewSet):
+    serializer_class = ReviewSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ReviewCursorPagination
+    response_cache_timeout = 60 * 15
+    _subscribed_location_ids = None
 
-        (
-            cache.delete_pattern(f"reviews:location:{location.id}*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
+    def get_queryset(self):
+        location_id = self.kwargs.get("location_pk")
 
-        cache.delete(get_location_detail_cache_key(location.id))
+        # ReviewSerializer reads user.email.
+        reviews = Review.objects.select_related("user")
+        if location_id:
+            return reviews.filter(location_id=location_id)
+
+        return reviews.filter(location_id__in=self.get_subscribed_location_ids())
+
+    def get_subscribed_location_ids(self):
+        # Cached under the user's feed generation, which subscription changes bump.
+        if self._subscribed_location_ids is None:
+            user_id = self.request.user.id
+            cache_key = get_subscribed_locations_cache_key(user_id)
+            location_ids = cache.get(cache_key)
+            if location_ids is None:
+                location_ids = list(
+                    LocationSubscription.objects.filter(user_id=user_id).values_list(
+                        "location_id", flat=True
+                    )
+                )
+                if not self.may_be_stale():
+                    cache.set(cache_key, location_ids, timeout=None)
+            self._subscribed_location_ids = location_ids
+        return self._subscribed_location_ids
+
+    def get_response_cache_key(self):
+        location_id = self.kwargs.get("location_pk")
+        params_digest = get_query_params_digest(self.request.query_params)
 
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
+        if not location_id:
+            return get_subscribed_reviews_cache_key(
+                self.request.user.id, self.get_subscribed_location_ids(), params_digest
+            )
+        if self.action == "retrieve":
+            return get_review_detail_cache_key(location_id, self.kwargs["pk"])
+        return get_reviews_cache_key(location_id, params_digest)
+
+    def perform_create(self, serializer):
+        location_id = self.kwargs["location_pk"]
+        serializer.save(user=self.request.user, location_id=location_id)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        location = instance.location
-        location_id = location.id
-
         self.perform_destroy(instance)
-
-        location.update_average_rating()
-
-        (
-            cache.delete_pattern(f"reviews:location:{location_id}*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
-
-        cache.delete(get_location_detail_cache_key(location_id))
-
-        (
-            cache.delete_pattern("locations:list:*")
-            if hasattr(cache, "delete_pattern")
-            else None
-        )
-
         return Response({"detail": "Review deleted."}, status=status.HTTP_200_OK)
 
 
-class LikeDislikeView(APIView):
+class LikeDislikeView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, review_pk, *args, **kwargs):
@@ -302,19 +438,18 @@ class LikeDislikeView(APIView):
         if cached_data:
             return Response(cached_data, status=status.HTTP_200_OK)
 
-        try:
-            review = Review.objects.get(pk=review_pk)
-        except Review.DoesNotExist:
+        response_data = (
+            Review.objects.filter(pk=review_pk)
+            .values("likes_count", "dislikes_count")
+            .first()
+        )
+        if response_data is None:
             return Response(
                 {"detail": "Review not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
-        likes_count = review.likes_dislikes.filter(is_like=True).count()
-        dislikes_count = review.likes_dislikes.filter(is_like=False).count()
-
-        response_data = {"likes_count": likes_count, "dislikes_count": dislikes_count}
-
-        cache.set(cache_key, response_data, timeout=300)
+        if not self.may_be_stale():
+            cache.set(cache_key, response_data, timeout=300)
 
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -326,27 +461,25 @@ class LikeDislikeView(APIView):
                 {"detail": "Review not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
-        is_like = request.data.get("is_like", None)
-        if is_like is None:
+        try:
+            # Form posts send "False"/"0" as strings; compare and store a real bool.
+            is_like = serializers.BooleanField().to_internal_value(request.data.get("is_like"))
+        except ValidationError:
             return Response(
                 {"detail": "Please provide is_like (True or False)."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         like_dislike, created = LikeDislike.objects.get_or_create(
-            user=request.user, review=review
+            user=request.user, review=review, defaults={"is_like": is_like}
         )
 
         if created or like_dislike.is_like != is_like:
-            like_dislike.is_like = is_like
-            like_dislike.save()
-
-            location_id = review.location.id
-            (
-                cache.delete_pattern(f"reviews:location:{location_id}*")
-                if hasattr(cache, "delete_pattern")
-                else None
-            )
+            if not created:
+                like_dislike.is_like = is_like
+                like_dislike.save(update_fields=["is_like"])
+
+            invalidate_location_review_caches(review.location_id)
 
             cache.delete(get_likes_dislikes_cache_key(review_pk))
 
@@ -360,19 +493,14 @@ class LikeDislikeView(APIView):
 
     def delete(self, request, review_pk, *args, **kwargs):
         try:
-            like_dislike = LikeDislike.objects.get(
+            like_dislike = LikeDislike.objects.select_related("review").get(
                 user=request.user, review__id=review_pk
             )
-            review = like_dislike.review
-            location_id = review.location.id
+            location_id = like_dislike.review.location_id
 
             like_dislike.delete()
 
-            (
-                cache.delete_pattern(f"reviews:location:{location_id}*")
-                if hasattr(cache, "delete_pattern")
-                else None
-            )
+            invalidate_location_review_caches(location_id)
 
             cache.delete(get_likes_dislikes_cache_key(review_pk))
 
@@ -0,0 +1,44 @@
+"""Gunicorn configuration for the web containers.
+
+Gunicorn picks this file up from the working directory, so ``gunicorn`` alone
+serves the app. ``APP_SERVER=wsgi`` (default) runs ``locations.wsgi`` on
+threaded sync workers; ``APP_SERVER=asgi`` runs ``locations.asgi`` on Uvicorn
+workers. Every knob can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+APP_SERVER = os.getenv("APP_SERVER", "wsgi")
+if APP_SERVER not in ("wsgi", "asgi"):
+    raise ValueError(f"APP_SERVER must be 'wsgi' or 'asgi', not {APP_SERVER!r}.")
+
+wsgi_app = f"locations.{APP_SERVER}:application"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# (2 x cores) + 1 is the usual starting point for I/O-bound Django workers.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Threads only apply to the gthread worker; an ASGI worker has its own event loop.
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = os.getenv(
+    "GUNICORN_WORKER_CLASS",
+    "uvicorn_worker.UvicornWorker" if APP_SERVER == "asgi" else "gthread",
+)
+
+# Restart a worker after this many requests (plus jitter, so they do not all
+# restart at once) to cap slow memory growth; the worker finishes its
+# in-flight requests first.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Keep above the idle timeout of the load balancer in front, or it may reuse a closed connection.
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# The heartbeat file lives in memory; a disk-backed /tmp in a container can stall workers.
+worker_tmp_dir = os.getenv("GUNICORN_WORKER_TMP_DIR", "/dev/shm")
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
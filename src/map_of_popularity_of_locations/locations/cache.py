@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import time
+import weakref
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+from redis import asyncio as aioredis
+
+from .metrics import record_cache_call
+
+_MISSING = object()
+
+# Event loop -> {server URL: redis.asyncio client}. Async clients are bound to
+# the loop that created them, and Django hands every async context its own
+# cache instance, so the clients are shared here rather than per instance.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _timed(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            record_cache_call(time.perf_counter() - started)
+
+    return wrapper
+
+
+class InstrumentedRedisCache(RedisCache):
+    """django-redis cache that reports hits, misses and time to the request metrics.
+
+    ``aget``/``aadd``/``aset`` (and ``aget_or_set`` built on them) talk to Redis
+    through ``redis.asyncio`` on the running event loop instead of the base
+    class's ``sync_to_async`` thread hop. Keys and values are encoded by the
+    django-redis client, so both APIs read each other's entries.
+    ``OPTIONS["ASYNC_CONNECTION_POOL_KWARGS"]`` is passed to the async pool.
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        started = time.perf_counter()
+        value = super().get(key, default=_MISSING, version=version, client=client)
+        hit = value is not _MISSING
+        record_cache_call(time.perf_counter() - started, hits=int(hit), misses=int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        started = time.perf_counter()
+        values = super().get_many(keys, version=version, client=client)
+        record_cache_call(
+            time.perf_counter() - started,
+            hits=len(values),
+            misses=len(keys) - len(values),
+        )
+        return values
+
+    add = _timed(RedisCache.add)
+    set = _timed(RedisCache.set)
+    set_many = _timed(RedisCache.set_many)
+    delete = _timed(RedisCache.delete)
+    delete_many = _timed(RedisCache.delete_many)
+    incr = _timed(RedisCache.incr)
+    decr = _timed(RedisCache.decr)
+    has_key = _timed(RedisCache.has_key)
+    touch = _timed(RedisCache.touch)
+
+    def _get_async_client(self):
+        server = self._server if isinstance(self._server, str) else self._server[0]
+        server = server.split(",")[0]
+        clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(server)
+        if client is None:
+            pool_kwargs = self._params.get("OPTIONS", {}).get("ASYNC_CONNECTION_POOL_KWARGS", {})
+            client = clients[server] = aioredis.Redis(
+                connection_pool=aioredis.ConnectionPool.from_url(server, **pool_kwargs)
+            )
+        return client
+
+    async def aget(self, key, default=None, version=None):
+        started = time.perf_counter()
+        value = await self._get_async_client().get(self.client.make_key(key, version=version))
+        hit = value is not None
+        record_cache_call(time.perf_counter() - started, hits=int(hit), misses=int(not hit))
+        return self.client.decode(value) if hit else default
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, nx=False):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        key = self.client.make_key(key, version=version)
+        client = self._get_async_client()
+        started = time.perf_counter()
+        try:
+            if timeout is not None and timeout <= 0:
+                # Same as django-redis: a non-positive timeout expires the key at once.
+                await client.delete(key)
+                return False
+            return bool(
+                await client.set(
+                    key,
+                    self.client.encode(value),
+                    px=None if timeout is None else int(timeout * 1000),
+                    nx=nx,
+                )
+            )
+        finally:
+            record_cache_call(time.perf_counter() - started)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self.aset(key, value, timeout=timeout, version=version, nx=True)
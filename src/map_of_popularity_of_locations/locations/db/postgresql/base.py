@@ -0,0 +1,61 @@
+"""PostgreSQL backend that records how long acquiring a connection takes.
+
+``get_new_connection`` is a fresh TCP/TLS/auth handshake whenever a request or
+task finds no persistent connection to reuse (``CONN_MAX_AGE``), so its
+duration is the time it spent waiting for a connection.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+logger = logging.getLogger("locations.db")
+
+
+class ConnectionAcquireStats:
+    """Process-wide counters of connection acquisitions, safe to update from threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "total_ms": round(self.total_seconds * 1000, 3),
+                "max_ms": round(self.max_seconds * 1000, 3),
+            }
+
+
+acquire_stats = ConnectionAcquireStats()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        elapsed = time.perf_counter() - started
+        acquire_stats.record(elapsed)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= settings.DB_ACQUIRE_WARN_MS:
+            logger.warning("Waited %.1f ms for a %s connection.", elapsed_ms, self.alias)
+        else:
+            logger.debug("Acquired a %s connection in %.1f ms.", self.alias, elapsed_ms)
+        return connection
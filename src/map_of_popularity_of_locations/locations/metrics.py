@@ -0,0 +1,122 @@
+"""Per-request SQL/cache/timing metrics and their Prometheus text exposition.
+
+``RequestMetricsMiddleware`` fills a ``RequestMetrics`` for every request. The
+totals are accumulated in one Redis hash (a single pipelined HINCRBYFLOAT per
+request), so every web worker reports into the same counters and any of them
+can answer a scrape of ``/metrics``.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django_redis import get_redis_connection
+
+logger = logging.getLogger("locations.metrics")
+
+METRICS_HASH_KEY = "metrics:http"
+
+# Metric name -> (type, help text, RequestMetrics attribute or None for the request count).
+REQUEST_METRICS = {
+    "http_requests_total": ("counter", "Requests handled.", None),
+    "http_request_duration_seconds_sum": ("counter", "Total time spent handling requests.", "total_seconds"),
+    "http_request_sql_queries_total": ("counter", "SQL queries executed.", "sql_queries"),
+    "http_request_sql_duration_seconds_sum": ("counter", "Time spent in SQL queries.", "sql_seconds"),
+    "http_request_cache_hits_total": ("counter", "Cache reads that found a value.", "cache_hits"),
+    "http_request_cache_misses_total": ("counter", "Cache reads that found nothing.", "cache_misses"),
+    "http_request_cache_duration_seconds_sum": ("counter", "Time spent in cache calls.", "cache_seconds"),
+}
+METRIC_LABELS = ("view", "method", "status")
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = "unresolved"
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_queries += 1
+            self.sql_seconds += time.perf_counter() - started
+
+
+def start_request_metrics():
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+
+def stop_request_metrics(token):
+    _current_metrics.reset(token)
+
+
+def get_request_metrics():
+    """Metrics of the request being handled, or None outside of one."""
+    return _current_metrics.get()
+
+
+def record_cache_call(seconds, hits=0, misses=0):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.cache_seconds += seconds
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def _field(metric, view, method, status):
+    return f"{metric}|{view}|{method}|{status}"
+
+
+def record_request(metrics, method, status):
+    try:
+        with get_redis_connection("default").pipeline(transaction=False) as pipeline:
+            for metric, (_, _, attribute) in REQUEST_METRICS.items():
+                value = 1 if attribute is None else getattr(metrics, attribute)
+                if value:
+                    pipeline.hincrbyfloat(
+                        METRICS_HASH_KEY, _field(metric, metrics.view, method, status), value
+                    )
+            pipeline.execute()
+    except Exception:
+        # Metrics must never fail the request they describe.
+        logger.exception("Could not record request metrics.")
+
+
+def render_prometheus():
+    samples = defaultdict(list)
+    stored = get_redis_connection("default").hgetall(METRICS_HASH_KEY)
+    for field, value in sorted(stored.items()):
+        metric, *labels = field.decode().split("|")
+        samples[metric].append((labels, float(value)))
+
+    lines = []
+    for metric, (metric_type, help_text, _) in REQUEST_METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for labels, value in samples.get(metric, ()):
+            label_text = ",".join(
+                f'{name}="{label}"' for name, label in zip(METRIC_LABELS, labels)
+            )
+            lines.append(f"{metric}{{{label_text}}} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, guarded by METRICS_TOKEN when it is set."""
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,141 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import (
+    record_request,
+    start_request_metrics,
+    stop_request_metrics,
+)
+
+logger = logging.getLogger("locations.metrics")
+
+
+def get_view_name(view_func, method):
+    """``LocationViewSet.list`` for DRF and class-based views, the function name otherwise."""
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if view_class is None:
+        return getattr(view_func, "__name__", "unknown")
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+class RequestMetricsMiddleware:
+    """Count SQL queries, cache calls and time per request, tagged by view.
+
+    The totals go to the Prometheus counters, to ``response.request_metrics``
+    (used by ``locations.testing``) and, with ``REQUEST_METRICS_HEADERS``, to
+    ``X-*`` response headers. Goes first in MIDDLEWARE, after the static files,
+    so the time covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics, token = start_request_metrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self._wrap_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics, token = start_request_metrics()
+        started = time.perf_counter()
+        # Database connections are per thread, and the ORM calls of an ASGI
+        # request all run on the one thread sync_to_async keeps for it; the
+        # query wrappers have to be installed there.
+        stack = ExitStack()
+        try:
+            await sync_to_async(self._wrap_queries)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            stop_request_metrics(token)
+        return await sync_to_async(self._finish)(request, response, metrics, started)
+
+    @staticmethod
+    def _wrap_queries(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.record_query))
+
+    def _finish(self, request, response, metrics, started):
+        metrics.total_seconds = time.perf_counter() - started
+        # Read here rather than in process_view, which would cost async
+        # requests one more thread handoff.
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None:
+            metrics.view = get_view_name(resolver_match.func, request.method)
+
+        response.request_metrics = metrics
+        record_request(metrics, request.method, response.status_code)
+
+        if settings.REQUEST_METRICS_HEADERS:
+            response["X-View"] = metrics.view
+            response["X-SQL-Queries"] = metrics.sql_queries
+            response["X-SQL-Time-ms"] = f"{metrics.sql_seconds * 1000:.2f}"
+            response["X-Cache-Hits"] = metrics.cache_hits
+            response["X-Cache-Misses"] = metrics.cache_misses
+            response["X-Cache-Time-ms"] = f"{metrics.cache_seconds * 1000:.2f}"
+            response["X-Response-Time-ms"] = f"{metrics.total_seconds * 1000:.2f}"
+            budget = settings.QUERY_BUDGETS.get(metrics.view)
+            if budget is not None and metrics.sql_queries > budget:
+                logger.warning(
+                    "%s ran %d SQL queries, over its budget of %d.",
+                    metrics.view,
+                    metrics.sql_queries,
+                    budget,
+                )
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that lets ASGI requests for anything but a static file stay async.
+
+    ``WhiteNoiseMiddleware`` is sync-only, which makes Django run every request
+    of an async view through an extra thread handoff.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
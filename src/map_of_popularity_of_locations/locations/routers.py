@@ -0,0 +1,85 @@
+"""Primary/replica database routing with read-your-writes stickiness.
+
+Reads go to a replica only inside a request that opted in (``ReplicaReadMixin``
+on safe methods), so Celery tasks, management commands and every write path
+keep using ``default``. A user who wrote recently is pinned to the primary for
+``REPLICA_STICKY_SECONDS`` through a cache marker, so their next reads cannot
+hit a replica that has not replayed the write yet. Without
+``DATABASE_REPLICAS`` everything reads from ``default`` and no markers are set.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_STICKY_KEY = "db:primary:user:{user_id}"
+RECENT_WRITE_KEY = "db:primary:recent-write"
+
+_replica_reads_allowed = ContextVar("replica_reads_allowed", default=False)
+
+
+def allow_replica_reads(allowed=True):
+    """Let the router send the following reads to a replica; returns a reset token."""
+    return _replica_reads_allowed.set(allowed)
+
+
+def reset_replica_reads(token):
+    _replica_reads_allowed.reset(token)
+
+
+def replica_reads_enabled():
+    return bool(settings.DATABASE_REPLICAS)
+
+
+def pin_user_to_primary(user_id):
+    # Without replicas there is no lag to wait out, and the markers would only
+    # turn off response caching for everyone after each write.
+    if not replica_reads_enabled():
+        return
+    timeout = settings.REPLICA_STICKY_SECONDS
+    cache.set_many(
+        {PRIMARY_STICKY_KEY.format(user_id=user_id): True, RECENT_WRITE_KEY: True},
+        timeout=timeout,
+    )
+
+
+def is_user_pinned_to_primary(user_id):
+    return bool(cache.get(PRIMARY_STICKY_KEY.format(user_id=user_id)))
+
+
+async def ais_user_pinned_to_primary(user_id):
+    return bool(await cache.aget(PRIMARY_STICKY_KEY.format(user_id=user_id)))
+
+
+def replicas_may_lag():
+    """True while a write is younger than the replication lag allowance."""
+    return replica_reads_enabled() and bool(cache.get(RECENT_WRITE_KEY))
+
+
+async def areplicas_may_lag():
+    return replica_reads_enabled() and bool(await cache.aget(RECENT_WRITE_KEY))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if replica_reads_enabled() and _replica_reads_allowed.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Reads later in the same request must see this write.
+        _replica_reads_allowed.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db not in settings.DATABASE_REPLICAS
@@ -24,7 +24,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-g5q%!9wwwp0u)(zovj)8wl**6g*t+o5)2r4z)frz@j2^n3+5uz')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv('DEBUG', 'True') == 'True'
+# Off unless asked for: with DEBUG on Django also keeps every SQL query in memory.
+DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'api',
     'registration',
     'rest_framework',
@@ -45,6 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # WhiteNoise: answers /static/ requests before the rest of the stack runs.
+    'locations.middleware.StaticFilesMiddleware',
+    'locations.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,15 +85,41 @@ WSGI_APPLICATION = 'locations.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.postgresql plus connection-acquire timing.
+        'ENGINE': 'locations.db.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'postgres'),
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('POSTGRES_HOST', 'db'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Keep connections open across requests/tasks instead of reconnecting each time,
+        # and ping a reused connection once per request so a dropped one is replaced.
+        # Under ASGI every request may run on a new thread, so persistent
+        # connections would pile up; there they are closed after each request.
+        'CONN_MAX_AGE': 0 if os.getenv('APP_SERVER') == 'asgi' else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {},
     }
 }
 
+# Read replicas: a comma-separated list of hosts sharing the default credentials,
+# exposed as the aliases replica_1..replica_N. The views using ReplicaReadMixin
+# send their safe-method reads there; everything else stays on default.
+for _index, _host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host.strip(),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['locations.routers.PrimaryReplicaRouter']
+# How long a user reads from the primary after a write; keep it above the replication lag.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
+# Connection acquisitions slower than this are logged as warnings by locations.db.
+DB_ACQUIRE_WARN_MS = float(os.getenv('DB_ACQUIRE_WARN_MS', '100'))
+
 
 
 # Password validation
@@ -112,30 +143,120 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'registration.auth.CsrfExemptSessionAuthentication',
+        'registration.auth.SignedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '50')),
 }
 
+# Upper bound for the ?page_size= query parameter of cursor-paginated endpoints.
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '200'))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'locations.cache.InstrumentedRedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://redis:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         },
-    }
+    },
+    # Own Redis database, so flushing the response cache does not log everyone out.
+    'sessions': {
+        'BACKEND': 'locations.cache.InstrumentedRedisCache',
+        'LOCATION': os.getenv('SESSION_REDIS_URL', 'redis://redis:6379/2'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    },
+    # Leaderboard sorted sets (api.leaderboards): not a cache, so kept apart from
+    # the response cache that is flushed and evicted.
+    'leaderboards': {
+        'BACKEND': 'locations.cache.InstrumentedRedisCache',
+        'LOCATION': os.getenv('LEADERBOARD_REDIS_URL', 'redis://redis:6379/3'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    },
+}
+
+
+# Per-request SQL/cache/timing metrics (locations.middleware), exported for
+# Prometheus at /metrics; METRICS_TOKEN, when set, must be sent as a bearer token.
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True'
+REQUEST_METRICS_HEADERS = os.getenv('REQUEST_METRICS_HEADERS', str(DEBUG)) == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Maximum SQL queries per request of a view, checked by locations.testing and
+# logged when exceeded while REQUEST_METRICS_HEADERS is on.
+QUERY_BUDGETS = {
+    'LocationViewSet.list': 2,
+    # One more than the list: the detail ETag is read from the row before the cache.
+    'LocationViewSet.retrieve': 3,
+    'LocationViewSet.top': 2,
+    'LocationViewSet.clusters': 1,
+    'LocationViewSet.subscribe': 4,
+    # The subscribed feed reloads the user's subscriptions after they change.
+    'ReviewViewSet.list': 2,
+    'ReviewViewSet.retrieve': 1,
+    'ReviewViewSet.create': 12,
+    'LikeDislikeView.get': 1,
+    'LikeDislikeView.post': 12,
+    'AsyncLocationListView.get': 2,
+    'AsyncLocationDetailView.get': 2,
+    'AsyncReviewListView.get': 1,
+    'AsyncLikeDislikeView.get': 1,
 }
 
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
 
+CELERY_BEAT_SCHEDULE = {
+    'clear-expired-sessions': {
+        'task': 'registration.tasks.clear_expired_sessions',
+        'schedule': int(os.getenv('SESSION_CLEANUP_INTERVAL', '86400')),
+    },
+    'send-notification-digests': {
+        'task': 'api.tasks.send_notification_digests',
+        'schedule': int(os.getenv('NOTIFICATION_DIGEST_INTERVAL', '3600')),
+    },
+    'decay-location-popularity': {
+        'task': 'api.tasks.decay_location_popularity',
+        'schedule': int(os.getenv('POPULARITY_DECAY_INTERVAL', '3600')),
+    },
+}
+
+# Popularity score: ratings are smoothed towards POPULARITY_PRIOR_RATING with the
+# weight of POPULARITY_PRIOR_WEIGHT reviews; review/vote activity halves every
+# POPULARITY_HALF_LIFE_HOURS, applied by the beat job every POPULARITY_DECAY_INTERVAL seconds.
+POPULARITY_PRIOR_RATING = float(os.getenv('POPULARITY_PRIOR_RATING', '6'))
+POPULARITY_PRIOR_WEIGHT = float(os.getenv('POPULARITY_PRIOR_WEIGHT', '10'))
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv('POPULARITY_HALF_LIFE_HOURS', '168'))
+POPULARITY_DECAY_INTERVAL = int(os.getenv('POPULARITY_DECAY_INTERVAL', '3600'))
+
+# Directory where the Celery export jobs write their CSV / JSON Lines / Parquet files.
+EXPORT_STORAGE_DIR = os.getenv('EXPORT_STORAGE_DIR', str(BASE_DIR / 'exports'))
+
 AUTH_USER_MODEL = 'registration.CustomUser'
 
-SESSION_ENGINE = "django.contrib.sessions.backends.db"
+# SESSION_BACKEND: "cache" (Redis only), "cached_db" (Redis in front of
+# django_session, the default) or "db". With cached_db an authenticated request
+# reads its session from Redis and only writes through to the table on change.
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.getenv('SESSION_BACKEND', 'cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Resolve request.user from the cache as well; user saves and deletes evict the entry.
+AUTHENTICATION_BACKENDS = ['registration.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '300'))
+
+# Lifetimes (seconds) of the signed bearer tokens issued by LoginView. Access tokens
+# are verified without any lookup, so keep them short; refresh re-checks the user.
+AUTH_ACCESS_TOKEN_TTL = int(os.getenv('AUTH_ACCESS_TOKEN_TTL', '300'))
+AUTH_REFRESH_TOKEN_TTL = int(os.getenv('AUTH_REFRESH_TOKEN_TTL', str(7 * 24 * 3600)))
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -162,6 +283,15 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Filled by collectstatic at image build time and served by WhiteNoise with
+# compressed variants and far-future cache headers for the hashed names.
+STATIC_ROOT = os.getenv('STATIC_ROOT', str(BASE_DIR / 'staticfiles'))
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# Fall back to the unhashed name instead of failing when collectstatic has not run.
+WHITENOISE_MANIFEST_STRICT = False
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
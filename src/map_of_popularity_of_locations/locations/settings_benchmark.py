@@ -0,0 +1,84 @@
+"""Settings for ``manage.py benchmark_api`` runs on a single machine, offline.
+
+The database is a throwaway SQLite file unless ``BENCHMARK_DATABASE=postgres``
+selects the local PostgreSQL configured by the usual ``POSTGRES_*`` variables.
+The caches use the Redis of ``REDIS_URL``/``SESSION_REDIS_URL``/
+``LEADERBOARD_REDIS_URL`` when ``REDIS_URL`` is set; otherwise they run against
+an in-process fakeredis server (``pip install fakeredis lupa``; lupa provides the
+Lua scripting django-redis uses for ``incr``). Leaderboards and request metrics
+need Redis commands, so a locmem cache cannot stand in for them. Celery tasks
+run eagerly and mail stays in memory.
+
+    DJANGO_SETTINGS_MODULE=locations.settings_benchmark python manage.py benchmark_api
+"""
+
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES
+
+# benchmark_api refuses to flush and seed a database unless this is set.
+BENCHMARK_DATABASE = True
+
+if os.getenv('BENCHMARK_DATABASE', 'sqlite') == 'postgres':
+    DATABASES = {'default': {**DATABASES['default'], 'HOST': os.getenv('POSTGRES_HOST', 'localhost')}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv(
+                'BENCHMARK_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'locations-benchmark.sqlite3')
+            ),
+            # The live-server mode writes from several threads.
+            'OPTIONS': {'timeout': 30},
+        }
+    }
+DATABASE_REPLICAS = []
+
+# The schema is created with ``migrate --run-syncdb``.
+MIGRATION_MODULES = {'api': None, 'registration': None}
+
+if not os.getenv('REDIS_URL'):
+    try:
+        import fakeredis
+        import fakeredis.aioredis
+    except ImportError:
+        raise ImproperlyConfigured(
+            'Offline benchmarks need fakeredis (pip install fakeredis lupa) or REDIS_URL.'
+        )
+    _fake_redis_server = fakeredis.FakeServer()
+    CACHES = {
+        alias: {
+            **config,
+            'LOCATION': f'redis://benchmark/{index}',
+            'OPTIONS': {
+                **config.get('OPTIONS', {}),
+                'CONNECTION_POOL_KWARGS': {
+                    'connection_class': fakeredis.FakeConnection,
+                    'server': _fake_redis_server,
+                },
+                'ASYNC_CONNECTION_POOL_KWARGS': {
+                    'connection_class': fakeredis.aioredis.FakeConnection,
+                    'server': _fake_redis_server,
+                },
+            },
+        }
+        for index, (alias, config) in enumerate(CACHES.items(), start=1)
+    }
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BROKER_URL = 'memory://'
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+EXPORT_STORAGE_DIR = os.path.join(tempfile.gettempdir(), 'locations-benchmark-exports')
+
+# Keeps Django from recording every query of the run in memory.
+DEBUG = False
+REQUEST_METRICS_ENABLED = True
+# The live-server mode reads query counts from the X-SQL-Queries header.
+REQUEST_METRICS_HEADERS = True
+
+# Nothing is collected for benchmark runs; static files are not benchmarked.
+STATIC_ROOT = None
@@ -0,0 +1,56 @@
+"""Settings for the test suite, runnable offline.
+
+The database is an in-memory SQLite and the caches share one in-process
+fakeredis server (``pip install fakeredis lupa``), as in settings_benchmark.
+Celery tasks run eagerly and mail stays in memory.
+
+    DJANGO_SETTINGS_MODULE=locations.settings_test python manage.py test
+"""
+
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}
+DATABASE_REPLICAS = []
+# The schema is created from the models.
+MIGRATION_MODULES = {'api': None, 'registration': None}
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:
+    raise ImproperlyConfigured('The tests need fakeredis (pip install fakeredis lupa).')
+_fake_redis_server = fakeredis.FakeServer()
+CACHES = {
+    alias: {
+        **config,
+        'LOCATION': f'redis://test/{index}',
+        'OPTIONS': {
+            **config.get('OPTIONS', {}),
+            'CONNECTION_POOL_KWARGS': {
+                'connection_class': fakeredis.FakeConnection,
+                'server': _fake_redis_server,
+            },
+            'ASYNC_CONNECTION_POOL_KWARGS': {
+                'connection_class': fakeredis.aioredis.FakeConnection,
+                'server': _fake_redis_server,
+            },
+        },
+    }
+    for index, (alias, config) in enumerate(CACHES.items(), start=1)
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BROKER_URL = 'memory://'
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+EXPORT_STORAGE_DIR = os.path.join(tempfile.gettempdir(), 'locations-test-exports')
+
+# The query budget assertions read the metrics recorded per request.
+REQUEST_METRICS_ENABLED = True
+
+STATIC_ROOT = None
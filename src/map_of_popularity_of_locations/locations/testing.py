@@ -0,0 +1,50 @@
+"""Query-budget assertions for tests.
+
+    response = client.get("/api/v1/locations/")
+    assert_within_query_budget(response)
+
+    with assert_max_queries(2):
+        client.get(f"/api/v1/reviews/{review.pk}/like_dislike/")
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _format_failure(label, count, budget, queries):
+    executed = "\n".join(f"  {index}. {query['sql']}" for index, query in enumerate(queries, 1))
+    return f"{label} ran {count} SQL queries, over its budget of {budget}.\n{executed}"
+
+
+@contextmanager
+def assert_max_queries(budget, using=DEFAULT_DB_ALIAS):
+    """Fail when the enclosed block runs more than ``budget`` queries on ``using``."""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > budget:
+        raise QueryBudgetExceeded(
+            _format_failure("The block", len(context), budget, context.captured_queries)
+        )
+
+
+def assert_within_query_budget(response, budget=None):
+    """Fail when the request behind ``response`` exceeded its ``QUERY_BUDGETS`` entry.
+
+    Reads the counters ``RequestMetricsMiddleware`` attached to the response.
+    """
+    metrics = getattr(response, "request_metrics", None)
+    if metrics is None:
+        raise AssertionError("The response carries no request metrics; is RequestMetricsMiddleware enabled?")
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(metrics.view)
+        if budget is None:
+            raise AssertionError(f"No query budget configured for {metrics.view}.")
+    if metrics.sql_queries > budget:
+        raise QueryBudgetExceeded(_format_failure(metrics.view, metrics.sql_queries, budget, []).rstrip())
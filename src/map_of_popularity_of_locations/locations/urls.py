@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     # path('admin/', admin.site.urls),
     path("api/v1/", include("registration.urls")),
     path("api/v1/", include("api.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,6 +1,68 @@
-from rest_framework.authentication import SessionAuthentication
+from rest_framework.authentication import (
+    BaseAuthentication,
+    SessionAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from .tokens import (
+    ACCESS_TOKEN,
+    InvalidToken,
+    adecode_token,
+    decode_token,
+    user_from_claims,
+)
 
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request):
         return
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """``Authorization: Bearer <access token>`` without a session or user lookup.
+
+    ``request.auth`` holds the verified claims of the token.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        token = self.get_token(request)
+        if token is None:
+            return None
+        try:
+            claims = decode_token(token, ACCESS_TOKEN)
+        except InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        return self.get_user(claims), claims
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; the revocation check uses the async cache."""
+        token = self.get_token(request)
+        if token is None:
+            return None
+        try:
+            claims = await adecode_token(token, ACCESS_TOKEN)
+        except InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        return self.get_user(claims), claims
+
+    def get_token(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed("Invalid Authorization header.")
+        try:
+            return header[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token.")
+
+    def get_user(self, claims):
+        if not claims["act"]:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return user_from_claims(claims)
+
+    def authenticate_header(self, request):
+        return self.keyword
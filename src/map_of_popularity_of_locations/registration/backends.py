@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def get_auth_user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_auth_user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is served from the cache."""
+
+    def get_user(self, user_id):
+        cache = get_auth_user_cache()
+        cache_key = get_auth_user_cache_key(user_id)
+        user = cache.get(cache_key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(cache_key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
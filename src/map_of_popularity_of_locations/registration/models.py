@@ -5,6 +5,7 @@ from django.db import models
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
     is_subscribed = models.BooleanField(default=False, help_text="Отримувати email про нові відгуки.")
+    review_digest = models.BooleanField(default=False, help_text="Отримувати email про нові відгуки одним дайджестом.")
 
     def __str__(self):
         return self.username
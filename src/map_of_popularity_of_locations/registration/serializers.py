@@ -10,7 +10,7 @@ User = get_user_model()
 class SignUpSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ("username", "password", "email")
+        fields = ("username", "password", "email", "is_subscribed", "review_digest")
 
     def validate(self, data):
         if User.objects.filter(username=data["username"]).exists():
@@ -22,6 +22,8 @@ class SignUpSerializer(serializers.ModelSerializer):
             username=validated_data["username"],
             password=validated_data["password"],
             email=validated_data["email"],
+            is_subscribed=validated_data.get("is_subscribed", False),
+            review_digest=validated_data.get("review_digest", False),
         )
 
 
@@ -45,6 +47,7 @@ class LoginSerializer(serializers.Serializer):
 
 class LogoutSerializer(serializers.Serializer):
     user_id = serializers.IntegerField(required=False)
+    refresh = serializers.CharField(required=False)
 
     def validate_user_id(self, value):
         if value and value == self.context["request"].user.id:
@@ -52,6 +55,10 @@ class LogoutSerializer(serializers.Serializer):
         return value
 
 
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
 class RequestPasswordEmailRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
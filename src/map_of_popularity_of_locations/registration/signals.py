@@ -0,0 +1,11 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import get_auth_user_cache, get_auth_user_cache_key
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    # Covers password changes too, so the session auth hash is never checked stale.
+    get_auth_user_cache().delete(get_auth_user_cache_key(instance.pk))
@@ -1,3 +1,5 @@
+from importlib import import_module
+
 from celery import shared_task
 from .utils import Util
 from django.conf import settings
@@ -11,3 +13,10 @@ def send_reset_password_email(email_body, user_email):
             }
     send_mail = Util.send_email(data)
     return send_mail
+
+
+@shared_task
+def clear_expired_sessions():
+    """Delete expired django_session rows; Redis expires cached sessions on its own."""
+    engine = import_module(settings.SESSION_ENGINE)
+    engine.SessionStore.clear_expired()
@@ -0,0 +1,103 @@
+"""Signed, stateless access/refresh tokens.
+
+A token is ``django.core.signing`` output (HMAC-SHA256 over the JSON claims with
+``SECRET_KEY``), so verifying it needs neither the session nor the user table.
+Revoked token ids are kept in the cache until the token would have expired.
+"""
+
+import secrets
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+
+from .backends import get_auth_user_cache
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+TOKEN_SALT = "registration.tokens"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def get_revoked_token_cache_key(token_id):
+    return f"auth:token:revoked:{token_id}"
+
+
+def _issue(user, token_type, ttl):
+    claims = {
+        "typ": token_type,
+        "uid": user.pk,
+        "act": user.is_active,
+        "jti": secrets.token_urlsafe(12),
+        "exp": int(time.time()) + ttl,
+    }
+    if token_type == REFRESH_TOKEN:
+        # Changes with the password, so a password change invalidates refresh tokens.
+        claims["pwd"] = user.get_session_auth_hash()
+    return signing.dumps(claims, salt=TOKEN_SALT)
+
+
+def issue_tokens(user):
+    return {
+        ACCESS_TOKEN: _issue(user, ACCESS_TOKEN, settings.AUTH_ACCESS_TOKEN_TTL),
+        REFRESH_TOKEN: _issue(user, REFRESH_TOKEN, settings.AUTH_REFRESH_TOKEN_TTL),
+    }
+
+
+def _verify_token(token, token_type):
+    try:
+        claims = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidToken("Invalid token.")
+    if claims.get("typ") != token_type:
+        raise InvalidToken("Invalid token type.")
+    if claims["exp"] <= time.time():
+        raise InvalidToken("Token has expired.")
+    return claims
+
+
+def decode_token(token, token_type):
+    """Verify signature, type, expiry and revocation; return the claims."""
+    claims = _verify_token(token, token_type)
+    if get_auth_user_cache().get(get_revoked_token_cache_key(claims["jti"])):
+        raise InvalidToken("Token has been revoked.")
+    return claims
+
+
+async def adecode_token(token, token_type):
+    claims = _verify_token(token, token_type)
+    if await get_auth_user_cache().aget(get_revoked_token_cache_key(claims["jti"])):
+        raise InvalidToken("Token has been revoked.")
+    return claims
+
+
+def revoke_token(claims):
+    remaining = int(claims["exp"] - time.time())
+    if remaining > 0:
+        get_auth_user_cache().set(
+            get_revoked_token_cache_key(claims["jti"]), True, timeout=remaining
+        )
+
+
+def user_from_claims(claims):
+    """A user instance with only id/is_active loaded; other fields load on first access."""
+    return get_user_model().from_db(
+        DEFAULT_DB_ALIAS, ["id", "is_active"], [claims["uid"], claims["act"]]
+    )
+
+
+def refresh_tokens(refresh_token):
+    """Rotate a refresh token: revoke it and issue a new pair for the current user."""
+    claims = decode_token(refresh_token, REFRESH_TOKEN)
+    user = get_user_model().objects.filter(pk=claims["uid"], is_active=True).first()
+    if user is None or not secrets.compare_digest(
+        claims.get("pwd", ""), user.get_session_auth_hash()
+    ):
+        raise InvalidToken("Invalid token.")
+    revoke_token(claims)
+    return issue_tokens(user)
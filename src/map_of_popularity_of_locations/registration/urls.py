@@ -6,12 +6,14 @@ from .views import (
     SignUpView,
     LoginView,
     LogoutView,
+    TokenRefreshView,
 )
 
 urlpatterns = [
     path("signup/", SignUpView.as_view(), name="signup"),
     path("login/", LoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(), name="logout"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path(
         "request-reset-email/",
         RequestPasswordResetEmailGenericView.as_view(),
@@ -4,6 +4,14 @@ from rest_framework import status
 from django.contrib.auth import login, logout
 from django.contrib.auth import get_user_model
 from .tasks import send_reset_password_email
+from .tokens import (
+    REFRESH_TOKEN,
+    InvalidToken,
+    decode_token,
+    issue_tokens,
+    refresh_tokens,
+    revoke_token,
+)
 from .utils import Util
 from .serializers import (
     LogoutSerializer,
@@ -11,6 +19,7 @@ from .serializers import (
     SetNewPasswordSerializer,
     SignUpSerializer,
     LoginSerializer,
+    TokenRefreshSerializer,
 )
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.sites.shortcuts import get_current_site
@@ -40,7 +49,10 @@ class LoginView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data["user"]
             login(request, user)
-            return Response({"message": "Login successful."}, status=status.HTTP_200_OK)
+            return Response(
+                {"message": "Login successful.", **issue_tokens(user)},
+                status=status.HTTP_200_OK,
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -55,10 +67,31 @@ class LogoutView(APIView):
                 {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        # request.auth holds the claims when the call was made with a bearer token.
+        if isinstance(request.auth, dict):
+            revoke_token(request.auth)
+        refresh = serializer.validated_data.get("refresh")
+        if refresh:
+            try:
+                revoke_token(decode_token(refresh, REFRESH_TOKEN))
+            except InvalidToken:
+                pass
+
         logout(request)
         return Response({"message": "Logout successful."}, status=status.HTTP_200_OK)
 
 
+class TokenRefreshView(APIView):
+    def post(self, request):
+        serializer = TokenRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tokens = refresh_tokens(serializer.validated_data["refresh"])
+        except InvalidToken as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(tokens, status=status.HTTP_200_OK)
+
+
 class RequestPasswordResetEmailGenericView(GenericAPIView):
     serializer_class = RequestPasswordEmailRequestSerializer
 